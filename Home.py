@@ -31,8 +31,13 @@ def initialize_data():
 
 initialize_data()
 
-from analysis import kpi_summary, get_market_df, top_gainers
-from load import get_row_count
+from analysis import kpi_summary, get_market_df, top_gainers, etl_version, search_mask
+from load import get_row_count_estimate
+from config import ETL_INTERVAL_MINUTES
+
+# Caches live for a full ETL cycle; they are dropped early when the ETL
+# publishes a new data version (see the version check below).
+CACHE_TTL = ETL_INTERVAL_MINUTES * 60
 
 # Custom CSS
 st.markdown("""
@@ -138,50 +143,89 @@ search_query = st.text_input(
     label_visibility="collapsed"
 )
 
+# Every loader below is keyed on the data version, so a new ETL load is a cache miss
+data_version = etl_version()
+
 # Load data with caching
-@st.cache_data(ttl=55)
-def load_kpis():
+@st.cache_data(ttl=CACHE_TTL)
+def load_kpis(version: str):
     return kpi_summary()
 
-@st.cache_data(ttl=55)
-def load_market_df():
+# Shared across sessions without pickling; callers treat the frame as read-only
+@st.cache_resource(ttl=CACHE_TTL, max_entries=2)
+def load_market_df(version: str):
     try:
-        return get_market_df()
+        df = get_market_df()
     except Exception:
         return pd.DataFrame()
+    if not df.empty:
+        # Pre-cased search keys so each keystroke is a plain substring scan
+        df["_name_lc"] = df["name"].str.lower()
+        df["_sym_lc"] = df["symbol"].str.lower()
+    return df
 
-@st.cache_data(ttl=55)
-def load_gainers():
+@st.cache_data(ttl=CACHE_TTL)
+def load_gainers(version: str):
     return top_gainers(10)
 
-kpis = load_kpis()
-market_df = load_market_df()
-gainers = load_gainers()
+@st.cache_data(ttl=CACHE_TTL)
+def load_row_count(version: str) -> int:
+    return get_row_count_estimate()
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_top5(col: str, version: str) -> list[dict]:
+    # Keyed on column name + data version, so the frame is never re-hashed per rerun
+    df = load_market_df(version)
+    if df.empty:
+        return []
+    return df.nlargest(5, col)[['name', 'symbol', col]].to_dict('records')
+
+kpis = load_kpis(data_version)
+market_df = load_market_df(data_version)
+gainers = load_gainers(data_version)
 
 # Search Results
 if search_query and not market_df.empty:
-    filtered_df = market_df[
-        market_df['name'].str.contains(search_query, case=False, na=False) |
-        market_df['symbol'].str.contains(search_query, case=False, na=False)
-    ]
+    filtered_df = market_df[search_mask(market_df, search_query)]
     
     if not filtered_df.empty:
         st.markdown(f"### 📊 Search Results ({len(filtered_df)} found)")
-        
-        for _, coin in filtered_df.iterrows():
-            col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
-            
-            with col1:
-                st.markdown(f"**{coin['name']}** ({coin['symbol'].upper()})")
-            with col2:
-                st.metric("Price", f"${coin['current_price']:,.2f}")
-            with col3:
-                change = coin['price_change_24h']
-                st.metric("24h Change", f"{change:+.2f}%", delta=f"{change:.2f}%")
-            with col4:
-                st.metric("Market Cap", f"${coin['market_cap']/1e9:.2f}B")
-            
-            st.markdown("---")
+
+        if len(filtered_df) > 3:
+            # One table payload instead of a metric-card row per match
+            results = filtered_df[
+                ["name", "symbol", "current_price", "price_change_24h", "market_cap"]
+            ].rename(columns={
+                "name": "Name",
+                "symbol": "Symbol",
+                "current_price": "Price",
+                "price_change_24h": "24h Change",
+                "market_cap": "Market Cap",
+            })
+            st.dataframe(
+                results.style.format({
+                    "Price": "${:,.2f}",
+                    "24h Change": "{:+.2f}%",
+                    "Market Cap": lambda x: f"${x/1e9:.2f}B",
+                }),
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            for _, coin in filtered_df.iterrows():
+                col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
+
+                with col1:
+                    st.markdown(f"**{coin['name']}** ({coin['symbol'].upper()})")
+                with col2:
+                    st.metric("Price", f"${coin['current_price']:,.2f}")
+                with col3:
+                    change = coin['price_change_24h']
+                    st.metric("24h Change", f"{change:+.2f}%", delta=f"{change:.2f}%")
+                with col4:
+                    st.metric("Market Cap", f"${coin['market_cap']/1e9:.2f}B")
+
+                st.markdown("---")
     else:
         st.info(f"No results found for '{search_query}'")
 
@@ -220,7 +264,7 @@ with k3:
     </div>""", unsafe_allow_html=True)
 
 with k4:
-    row_count = get_row_count()
+    row_count = load_row_count(data_version)
     st.markdown(f"""
     <div class="kpi-card">
         <div class="kpi-label">Total Records</div>
@@ -250,15 +294,13 @@ col1, col2 = st.columns(2)
 with col1:
     if not market_df.empty:
         st.markdown("**Top 5 by Market Cap**")
-        top5 = market_df.nlargest(5, 'market_cap')[['name', 'symbol', 'market_cap']]
-        for _, row in top5.iterrows():
+        for row in load_top5('market_cap', data_version):
             st.write(f"• **{row['name']}** ({row['symbol'].upper()}) - ${row['market_cap']/1e9:.2f}B")
 
 with col2:
     if not market_df.empty:
         st.markdown("**Top 5 by Volume**")
-        top5_vol = market_df.nlargest(5, 'total_volume')[['name', 'symbol', 'total_volume']]
-        for _, row in top5_vol.iterrows():
+        for row in load_top5('total_volume', data_version):
             st.write(f"• **{row['name']}** ({row['symbol'].upper()}) - ${row['total_volume']/1e9:.2f}B")
 
 # Footer
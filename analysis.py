@@ -6,6 +6,7 @@ Responsibilities:
   • Return clean Python dicts / DataFrames
   • Anomaly detection via Z-score on price_change_24h
   • Redis caching layer (optional) for expensive queries
+  • In-process cache of the latest snapshot shared by ranking queries
 
 Queries provided:
   1. top_gainers()          — Top 5 coins by 24h price change
@@ -17,11 +18,15 @@ Queries provided:
   7. volume_comparison()    — Volume per coin (latest)
   8. detect_anomalies()     — Z-score anomaly detection on 24h changes
   9. kpi_summary()          — All dashboard KPIs in one call
+ 10. dashboard_bundle()     — Everything the live dashboard renders, in one call
 """
 
+import functools
 import logging
 import math
-import statistics
+import time
+import warnings
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -34,14 +39,27 @@ except ImportError:
     _PANDAS = False
     logger.info("pandas not installed — returning plain dicts")
 
+try:
+    import numpy as np
+    _NUMPY = True
+except ImportError:
+    _NUMPY = False
+
 try:
     import redis
     _REDIS = True
 except ImportError:
     _REDIS = False
 
+try:
+    import orjson
+    _ORJSON = True
+except ImportError:
+    _ORJSON = False
+
 from config import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_TTL, ZSCORE_THRESHOLD
 from database import db, SQLiteManager
+from load import get_row_count_estimate
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -49,44 +67,68 @@ from database import db, SQLiteManager
 # ══════════════════════════════════════════════════════════════════════════════
 
 _redis_client = None
+_redis_pool = None
+_REDIS_DISABLED = not _REDIS   # flipped once on first connection failure
 
 def _get_redis():
-    global _redis_client
-    if not _REDIS:
+    global _redis_client, _redis_pool, _REDIS_DISABLED
+    if _REDIS_DISABLED:
         return None
     if _redis_client is None:
         try:
-            _redis_client = redis.Redis(
+            # One bounded pool shared by every caller in this process
+            _redis_pool = redis.ConnectionPool(
                 host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB,
-                decode_responses=True, socket_connect_timeout=2
+                decode_responses=True, socket_connect_timeout=2,
+                max_connections=8,
             )
+            _redis_client = redis.Redis(connection_pool=_redis_pool)
             _redis_client.ping()
             logger.debug("Redis connected")
         except Exception as exc:
             logger.warning("Redis unavailable (%s) — caching disabled", exc)
             _redis_client = None
+            _REDIS_DISABLED = True
     return _redis_client
 
 
-import json, hashlib
+import json
+
+def _dumps(value) -> "bytes | str":
+    if _ORJSON:
+        # datetimes/numpy handled natively in C; Decimal etc. fall back to str
+        return orjson.dumps(
+            value, default=str,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(value, default=str)
+
+
+def _loads(raw):
+    return orjson.loads(raw) if _ORJSON else json.loads(raw)
+
 
 def _cache_get(key: str):
+    if _REDIS_DISABLED:
+        return None
     r = _get_redis()
     if r is None:
         return None
     try:
         val = r.get(key)
-        return json.loads(val) if val else None
+        return _loads(val) if val else None
     except Exception:
         return None
 
 
 def _cache_set(key: str, value, ttl: int = REDIS_TTL):
+    if _REDIS_DISABLED:
+        return
     r = _get_redis()
     if r is None:
         return
     try:
-        r.setex(key, ttl, json.dumps(value, default=str))
+        r.setex(key, ttl, _dumps(value))
     except Exception:
         pass
 
@@ -105,23 +147,215 @@ def _fetchall(sql: str, params: tuple = ()) -> list[dict]:
     with manager.get_cursor() as cur:
         cur.execute(sql, params)
         rows = cur.fetchall()
-        if not rows:
-            return []
-        if isinstance(rows[0], dict):
-            return [dict(r) for r in rows]
-        # SQLite Row / tuple
-        cols = [d[0] for d in cur.description]
-        return [dict(zip(cols, r)) for r in rows]
+    if rows and isinstance(rows[0], dict):
+        return rows                     # RealDictCursor already built dicts
+    # sqlite3.Row is a C mapping; dict() copies it without a Python-level zip
+    return [dict(r) for r in rows]
 
 
 def _fetchone(sql: str, params: tuple = ()) -> Optional[dict]:
-    rows = _fetchall(sql, params)
-    return rows[0] if rows else None
+    """Run a SELECT and return its first row as a dict (or None)."""
+    with db().get_cursor() as cur:
+        cur.execute(sql, params)
+        row = cur.fetchone()
+    return dict(row) if row is not None else None
+
+
+_LATEST_TS_TTL = 5   # seconds a resolved MAX(extracted_at) stays valid
+
+
+@functools.lru_cache(maxsize=1)
+def _latest_ts_at(manager, bucket: int):
+    """MAX(extracted_at) for `manager`, memoised per TTL bucket."""
+    with manager.get_cursor() as cur:
+        cur.execute(SQL_LATEST_TS)
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return row["ts"] if isinstance(row, dict) else row[0]
+
+
+def _latest_ts():
+    """
+    Timestamp of the latest snapshot, resolved once per few seconds
+    instead of once per query.
+    """
+    manager = db()
+    ts = _latest_ts_at(manager, int(time.monotonic() // _LATEST_TS_TTL))
+    if ts is None:
+        _latest_ts_at.cache_clear()   # don't pin an empty table
+    return ts
+
+
+@functools.lru_cache(maxsize=None)
+def _render_sql(template: str, sqlite: bool) -> str:
+    return template.format(
+        ph="?" if sqlite else "%s",
+        json_obj="json_object" if sqlite else "json_build_object",
+    )
+
+
+def _sql(template: str) -> str:
+    """Render a statement template for the active backend (memoised)."""
+    return _render_sql(template, _is_sqlite())
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SQL statements
+#  `{ph}` is the backend placeholder and `{json_obj}` the JSON-object builder;
+#  each template is formatted once per backend by _sql().
+#  Latest-snapshot statements take MAX(extracted_at) as their first parameter.
+# ══════════════════════════════════════════════════════════════════════════════
+
+SQL_LATEST_TS = "SELECT MAX(extracted_at) AS ts FROM crypto_market"
+
+SQL_SNAPSHOT = """
+    SELECT coin_id, symbol, name, current_price, market_cap, total_volume,
+           price_change_24h, market_cap_rank, volatility_score, extracted_at
+    FROM crypto_market
+    WHERE extracted_at = {ph}
+    ORDER BY market_cap_rank
+"""
+
+SQL_AVG_MCAP = """
+    SELECT AVG(market_cap) AS avg_mcap
+    FROM crypto_market
+    WHERE extracted_at = {ph}
+"""
+
+SQL_TOTAL_MCAP = """
+    SELECT SUM(market_cap) AS total_mcap
+    FROM crypto_market
+    WHERE extracted_at = {ph}
+"""
+
+SQL_PRICE_HISTORY = """
+    SELECT extracted_at, current_price, price_change_24h, total_volume
+    FROM crypto_market
+    WHERE coin_id = {ph}
+    ORDER BY extracted_at ASC
+    LIMIT {ph}
+"""
+
+SQL_KPI_SUMMARY = """
+    WITH latest AS (
+        SELECT coin_id, symbol, name, current_price, market_cap, total_volume,
+               price_change_24h, market_cap_rank, volatility_score
+        FROM crypto_market
+        WHERE extracted_at = {ph}
+    )
+    SELECT
+        (SELECT SUM(market_cap) FROM latest) AS total_mcap,
+        (SELECT AVG(market_cap) FROM latest) AS avg_mcap,
+        (SELECT AVG(current_price) FROM (
+            SELECT current_price FROM latest ORDER BY market_cap DESC LIMIT 10
+         ) top10) AS avg_top10_price,
+        (SELECT {json_obj}(
+            'coin_id', coin_id, 'symbol', symbol, 'name', name,
+            'current_price', current_price, 'price_change_24h', price_change_24h,
+            'market_cap_rank', market_cap_rank)
+         FROM latest ORDER BY price_change_24h DESC LIMIT 1) AS top_gainer,
+        (SELECT {json_obj}(
+            'coin_id', coin_id, 'symbol', symbol, 'name', name,
+            'volatility_score', volatility_score, 'price_change_24h', price_change_24h,
+            'total_volume', total_volume)
+         FROM latest ORDER BY volatility_score DESC LIMIT 1) AS most_volatile
+"""
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  In-process snapshot cache
+# ══════════════════════════════════════════════════════════════════════════════
+
+@functools.lru_cache(maxsize=1)
+def _snapshot_at(manager, ts) -> tuple[dict, ...]:
+    """Full snapshot at `ts` for `manager`; a new ETL load means a new key."""
+    return tuple(_fetchall(_sql(SQL_SNAPSHOT), (ts,)))
+
+
+def _load_snapshot() -> tuple[dict, ...]:
+    """
+    Latest snapshot rows, shared by all ranking queries below.
+    The row set is small (TOP_N_COINS), so rankings are cheap Python sorts.
+    """
+    snapshot = _snapshot_at(db(), _latest_ts())
+    if not snapshot:
+        _snapshot_at.cache_clear()
+    return snapshot
+
+
+def clear_snapshot_cache() -> None:
+    """Drop in-process snapshot caches (call after an ETL run lands new rows)."""
+    _snapshot_at.cache_clear()
+    _latest_ts_at.cache_clear()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ETL data version (lets dashboards refresh on new data instead of polling)
+# ══════════════════════════════════════════════════════════════════════════════
+
+_ETL_VERSION_KEY = "etl_version"
+_seen_version: Optional[str] = None
+
+
+def mark_etl_complete(extracted_at: datetime) -> None:
+    """
+    Called by the ETL after a successful load: drop stale caches and publish
+    the new data version to Redis (if available) for other processes.
+    """
+    clear_snapshot_cache()
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        stale = ["kpi_summary", *r.scan_iter("top_gainers:*"), *r.scan_iter("top_mcap:*")]
+        with r.pipeline(transaction=False) as pipe:
+            pipe.delete(*stale)
+            pipe.set(_ETL_VERSION_KEY, extracted_at.isoformat())
+            pipe.execute()
+    except Exception:
+        pass
 
 
-def _latest_ts_clause() -> str:
-    """SQL fragment to filter to the latest extracted_at snapshot."""
-    return "extracted_at = (SELECT MAX(extracted_at) FROM crypto_market)"
+def etl_version() -> str:
+    """
+    Tag identifying the latest loaded data. Uses the ETL-published Redis key,
+    falling back to MAX(extracted_at) when Redis is absent.
+    """
+    global _seen_version
+    r = _get_redis()
+    if r is not None:
+        try:
+            version = r.get(_ETL_VERSION_KEY)
+            if version:
+                if version != _seen_version:
+                    # New load from the ETL process: re-resolve MAX(extracted_at) now so
+                    # the snapshot fetched under this version isn't the previous one
+                    _seen_version = version
+                    _latest_ts_at.cache_clear()
+                return version
+        except Exception:
+            pass
+    return str(_latest_ts())
+
+
+# Projections returned by the ranking queries (also the bundle frames' columns)
+_GAINER_FIELDS     = ("coin_id", "symbol", "name", "current_price", "price_change_24h", "market_cap_rank")
+_MCAP_FIELDS       = ("coin_id", "symbol", "name", "market_cap", "current_price",
+                      "market_cap_rank", "price_change_24h")
+_VOLATILITY_FIELDS = ("coin_id", "symbol", "name", "volatility_score",
+                      "price_change_24h", "total_volume")
+_VOLUME_FIELDS     = ("symbol", "name", "total_volume", "current_price", "price_change_24h")
+_ANOMALY_FIELDS    = ("symbol", "name", "price_change_24h", "current_price", "z_score", "anomaly_type")
+
+
+def _ranked(key: str, fields: tuple[str, ...], limit: Optional[int] = None) -> list[dict]:
+    """Snapshot rows ordered by `key` DESC, projected onto `fields`."""
+    # NULLs last, as the SQL `ORDER BY key DESC` did — not ranked as 0
+    rows = sorted(_load_snapshot(), key=lambda r: (r[key] is not None, r[key] or 0), reverse=True)
+    if limit is not None:
+        rows = rows[:limit]
+    return [{f: r[f] for f in fields} for r in rows]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -135,20 +369,7 @@ def top_gainers(limit: int = 5) -> list[dict]:
     if cached:
         return cached
 
-    sql = f"""
-        SELECT coin_id, symbol, name, current_price, price_change_24h, market_cap_rank
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-        ORDER BY price_change_24h DESC
-        LIMIT ?
-    """ if _is_sqlite() else f"""
-        SELECT coin_id, symbol, name, current_price, price_change_24h, market_cap_rank
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-        ORDER BY price_change_24h DESC
-        LIMIT %s
-    """
-    result = _fetchall(sql, (limit,))
+    result = _ranked("price_change_24h", _GAINER_FIELDS, limit)
     _cache_set(cache_key, result, ttl=60)
     return result
 
@@ -164,15 +385,7 @@ def top_market_cap(limit: int = 10) -> list[dict]:
     if cached:
         return cached
 
-    sql = f"""
-        SELECT coin_id, symbol, name, market_cap, current_price,
-               market_cap_rank, price_change_24h
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-        ORDER BY market_cap DESC
-        LIMIT {'?' if _is_sqlite() else '%s'}
-    """
-    result = _fetchall(sql, (limit,))
+    result = _ranked("market_cap", _MCAP_FIELDS, limit)
     _cache_set(cache_key, result)
     return result
 
@@ -183,12 +396,7 @@ def top_market_cap(limit: int = 10) -> list[dict]:
 
 def avg_market_cap() -> float:
     """Average market cap across the latest snapshot."""
-    sql = f"""
-        SELECT AVG(market_cap) AS avg_mcap
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-    """
-    row = _fetchone(sql)
+    row = _fetchone(_sql(SQL_AVG_MCAP), (_latest_ts(),))
     return float(row.get("avg_mcap") or 0) if row else 0.0
 
 
@@ -198,12 +406,7 @@ def avg_market_cap() -> float:
 
 def total_market_value() -> float:
     """Sum of all market caps (latest snapshot)."""
-    sql = f"""
-        SELECT SUM(market_cap) AS total_mcap
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-    """
-    row = _fetchone(sql)
+    row = _fetchone(_sql(SQL_TOTAL_MCAP), (_latest_ts(),))
     return float(row.get("total_mcap") or 0) if row else 0.0
 
 
@@ -213,15 +416,7 @@ def total_market_value() -> float:
 
 def volatility_ranking(limit: int = 10) -> list[dict]:
     """Coins ranked by volatility_score DESC (latest snapshot)."""
-    sql = f"""
-        SELECT coin_id, symbol, name, volatility_score,
-               price_change_24h, total_volume
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-        ORDER BY volatility_score DESC
-        LIMIT {'?' if _is_sqlite() else '%s'}
-    """
-    return _fetchall(sql, (limit,))
+    return _ranked("volatility_score", _VOLATILITY_FIELDS, limit)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -233,17 +428,7 @@ def price_history(coin_id: str, limit: int = 100) -> list[dict]:
     Time-series of price for a given coin, oldest→newest.
     Returns list of {extracted_at, current_price, price_change_24h}
     """
-    sql = """
-        SELECT extracted_at, current_price, price_change_24h, total_volume
-        FROM crypto_market
-        WHERE coin_id = {}
-        ORDER BY extracted_at ASC
-        LIMIT {}
-    """.format(
-        "?" if _is_sqlite() else "%s",
-        "?" if _is_sqlite() else "%s",
-    )
-    return _fetchall(sql, (coin_id, limit))
+    return _fetchall(_sql(SQL_PRICE_HISTORY), (coin_id, limit))
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -252,19 +437,24 @@ def price_history(coin_id: str, limit: int = 100) -> list[dict]:
 
 def volume_comparison() -> list[dict]:
     """24h total volume per coin (latest snapshot), sorted descending."""
-    sql = f"""
-        SELECT symbol, name, total_volume, current_price, price_change_24h
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-        ORDER BY total_volume DESC
-    """
-    return _fetchall(sql)
+    return _ranked("total_volume", _VOLUME_FIELDS)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  Query 8: Anomaly Detection (Z-score)
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _mean_stdev(values: list[float]) -> tuple[float, float]:
+    """One-pass Welford mean and sample standard deviation (no numpy)."""
+    mean = m2 = 0.0
+    for n, x in enumerate(values, 1):
+        delta = x - mean
+        mean += delta / n
+        m2 += delta * (x - mean)
+    n = len(values)
+    return mean, math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+
+
 def detect_anomalies(threshold: float = ZSCORE_THRESHOLD) -> list[dict]:
     """
     Flag coins whose price_change_24h is statistically anomalous.
@@ -274,33 +464,42 @@ def detect_anomalies(threshold: float = ZSCORE_THRESHOLD) -> list[dict]:
 
     Returns list of {symbol, name, price_change_24h, z_score, anomaly_type}
     """
-    sql = f"""
-        SELECT symbol, name, price_change_24h, current_price, total_volume
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-    """
-    rows = _fetchall(sql)
+    rows = _load_snapshot()
     if len(rows) < 3:
         return []
 
-    changes = [float(r["price_change_24h"]) for r in rows]
-    mu    = statistics.mean(changes)
-    sigma = statistics.stdev(changes) or 1.0  # avoid divide-by-zero
-
-    anomalies = []
-    for r in rows:
-        z = (float(r["price_change_24h"]) - mu) / sigma
-        if abs(z) >= threshold:
-            anomalies.append({
-                "symbol":           r["symbol"],
-                "name":             r["name"],
-                "price_change_24h": round(float(r["price_change_24h"]), 4),
-                "current_price":    float(r["current_price"]),
-                "z_score":          round(z, 3),
-                "anomaly_type":     "spike" if z > 0 else "crash",
-            })
-
-    anomalies.sort(key=lambda x: abs(x["z_score"]), reverse=True)
+    if _NUMPY:
+        changes = np.fromiter(
+            (float(r["price_change_24h"]) for r in rows), dtype=np.float64, count=len(rows)
+        )
+        mu    = changes.mean()
+        sigma = changes.std(ddof=1) or 1.0  # avoid divide-by-zero
+        z     = (changes - mu) / sigma
+        hits  = np.nonzero(np.abs(z) >= threshold)[0]
+        hits  = hits[np.argsort(-np.abs(z[hits]), kind="stable")]
+        flagged = [(rows[i], float(z[i])) for i in hits]
+    else:
+        changes = [float(r["price_change_24h"]) for r in rows]
+        mu, sigma = _mean_stdev(changes)
+        sigma = sigma or 1.0  # avoid divide-by-zero
+        flagged = [
+            (r, (c - mu) / sigma) for r, c in zip(rows, changes)
+            if abs(c - mu) / sigma >= threshold
+        ]
+        flagged.sort(key=lambda f: abs(f[1]), reverse=True)
+
+    anomalies = [
+        {
+            "symbol":           r["symbol"],
+            "name":             r["name"],
+            "price_change_24h": round(float(r["price_change_24h"]), 4),
+            "current_price":    float(r["current_price"]),
+            "z_score":          round(z_val, 3),
+            "anomaly_type":     "spike" if z_val > 0 else "crash",
+        }
+        for r, z_val in flagged
+    ]
+
     logger.info("Anomaly scan: %d anomalies detected (threshold=%.1f)", len(anomalies), threshold)
     return anomalies
 
@@ -309,34 +508,36 @@ def detect_anomalies(threshold: float = ZSCORE_THRESHOLD) -> list[dict]:
 #  Query 9: KPI Summary (dashboard main call)
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _json_obj(value) -> dict:
+    """Decode a JSON object column (str on SQLite, dict on Postgres)."""
+    if value is None:
+        return {}
+    if isinstance(value, str):
+        return json.loads(value)
+    return dict(value)
+
+
 def kpi_summary() -> dict:
     """
     Compute all dashboard KPIs in one call.
     Returns a dict suitable for Streamlit KPI cards.
+
+    Everything is derived from a single CTE over the latest snapshot, so
+    the dashboard pays one DB round trip instead of five.
     """
     cache_key = "kpi_summary"
     cached = _cache_get(cache_key)
     if cached:
         return cached
 
-    total_mcap = total_market_value()
-    avg_mcap   = avg_market_cap()
-
-    gainers    = top_gainers(1)
-    volatile   = volatility_ranking(1)
-    top_coins  = top_market_cap(10)
-
-    avg_price  = (
-        sum(c["current_price"] for c in top_coins) / len(top_coins)
-        if top_coins else 0
-    )
+    row = _fetchone(_sql(SQL_KPI_SUMMARY), (_latest_ts(),)) or {}
 
     result = {
-        "total_market_cap":    total_mcap,
-        "avg_market_cap":      avg_mcap,
-        "avg_price_top10":     avg_price,
-        "highest_gainer":      gainers[0] if gainers else {},
-        "most_volatile":       volatile[0] if volatile else {},
+        "total_market_cap":    float(row.get("total_mcap") or 0),
+        "avg_market_cap":      float(row.get("avg_mcap") or 0),
+        "avg_price_top10":     float(row.get("avg_top10_price") or 0),
+        "highest_gainer":      _json_obj(row.get("top_gainer")),
+        "most_volatile":       _json_obj(row.get("most_volatile")),
         "computed_at":         datetime.now(tz=timezone.utc).isoformat(),
     }
 
@@ -348,30 +549,118 @@ def kpi_summary() -> dict:
 #  Optional: return pandas DataFrames
 # ══════════════════════════════════════════════════════════════════════════════
 
+# The cached frame also feeds the CSV/JSON exports, so numbers stay float64
+# (float32's ~7 significant digits would corrupt market caps and volumes);
+# only the repeated text columns are compacted.
+_MARKET_DTYPES = {
+    "current_price":    "float64",
+    "market_cap":       "float64",
+    "total_volume":     "float64",
+    "price_change_24h": "float64",
+    "volatility_score": "float64",
+    "symbol":           "category",
+    "name":             "category",
+}
+
+
+def _read_df(sql: str, params: tuple = (), **kwargs) -> "pd.DataFrame":
+    """Build a DataFrame straight from the DB cursor (no list-of-dicts step)."""
+    with db().get_connection() as conn:
+        with warnings.catch_warnings():
+            # pandas only "officially" supports SQLAlchemy/sqlite3; psycopg2 works fine
+            warnings.filterwarnings("ignore", message=".*SQLAlchemy.*", category=UserWarning)
+            return pd.read_sql_query(sql, conn, params=params, **kwargs)
+
+
 def get_market_df() -> "pd.DataFrame":
-    """Return full latest snapshot as a pandas DataFrame."""
+    """
+    Return full latest snapshot as a pandas DataFrame. Built from the shared
+    in-process snapshot, so a page asking for the market table and the
+    anomalies/rankings costs one DB round trip, not one per panel.
+    """
     if not _PANDAS:
         raise ImportError("pandas not installed")
-    sql = f"""
-        SELECT *
-        FROM crypto_market
-        WHERE {_latest_ts_clause()}
-        ORDER BY market_cap_rank
+    df = pd.DataFrame.from_records(list(_load_snapshot()), coerce_float=True)
+    if df.empty:
+        return df
+    return df.astype({c: t for c, t in _MARKET_DTYPES.items() if c in df.columns})
+
+
+def search_mask(df: "pd.DataFrame", query: str) -> "pd.Series":
     """
-    rows = _fetchall(sql)
-    return pd.DataFrame(rows)
+    Rows whose name or symbol contains `query` as one case-insensitive literal
+    phrase ("usd coin" → USD Coin, not every coin named *coin*). Uses the
+    pre-lowered `_name_lc` / `_sym_lc` columns when the caller cached them.
+    """
+    q = query.lower()
+    names = df["_name_lc"] if "_name_lc" in df else df["name"].astype(str).str.lower()
+    syms  = df["_sym_lc"] if "_sym_lc" in df else df["symbol"].astype(str).str.lower()
+    return (
+        names.str.contains(q, regex=False, na=False) |
+        syms.str.contains(q, regex=False, na=False)
+    )
 
 
 def get_history_df(coin_id: str, limit: int = 200) -> "pd.DataFrame":
-    """Return price history for a coin as a pandas DataFrame."""
+    """Return price history for a coin as a pandas DataFrame (oldest→newest)."""
     if not _PANDAS:
         raise ImportError("pandas not installed")
-    rows = price_history(coin_id, limit)
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df["extracted_at"] = pd.to_datetime(df["extracted_at"])
-        df = df.sort_values("extracted_at")
-    return df
+    return _read_df(
+        _sql(SQL_PRICE_HISTORY), (coin_id, limit),
+        dtype={"current_price": "float64", "price_change_24h": "float64",
+               "total_volume": "float64"},
+        parse_dates=["extracted_at"],
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  Dashboard bundle
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _records_df(rows: list[dict], fields: tuple[str, ...]) -> "pd.DataFrame":
+    """Frame with a fixed column set, skipping pandas' per-column inference."""
+    return pd.DataFrame.from_records(rows, columns=list(fields), coerce_float=True)
+
+
+@dataclass
+class DashboardBundle:
+    kpis:       dict = field(default_factory=dict)
+    market_df:  "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame())
+    gainers:    "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame(columns=_GAINER_FIELDS))
+    volume:     "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame(columns=_VOLUME_FIELDS))
+    volatility: "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame(columns=_VOLATILITY_FIELDS))
+    anomalies:  "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame(columns=_ANOMALY_FIELDS))
+    row_count:  int = 0
+
+
+def dashboard_bundle(top_n: int = 10) -> DashboardBundle:
+    """
+    All data the live dashboard renders on one rerun.
+
+    KPIs come from the single-query summary; every other panel (market
+    table, rankings, anomalies) is derived from one read of the latest
+    snapshot instead of a query per panel. Panels are returned as
+    DataFrames so the page only has to slice them.
+    """
+    if not _PANDAS:
+        raise ImportError("pandas not installed")
+    market_df = get_market_df()
+    if not market_df.empty:
+        market_df["market_cap_b"] = market_df["market_cap"] / 1e9
+    # Chart-ready USD-billion columns, scaled once per bundle
+    volume = _records_df(volume_comparison(), _VOLUME_FIELDS)
+    volume["volume_b"] = volume["total_volume"] / 1e9
+    volatility = _records_df(volatility_ranking(top_n), _VOLATILITY_FIELDS)
+    volatility["vs_b"] = volatility["volatility_score"] / 1e9
+    return DashboardBundle(
+        kpis=kpi_summary(),
+        market_df=market_df,
+        gainers=_records_df(top_gainers(top_n), _GAINER_FIELDS),
+        volume=volume,
+        volatility=volatility,
+        anomalies=_records_df(detect_anomalies(), _ANOMALY_FIELDS),
+        row_count=get_row_count_estimate(),
+    )
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -18,8 +18,9 @@ Endpoints:
 """
 
 import logging
+import time
 from datetime import datetime, timezone
-from typing import Optional
+from functools import lru_cache
 
 try:
     from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
@@ -56,10 +57,16 @@ app.add_middleware(
 )
 
 
+@lru_cache(maxsize=1)
+def _now_iso_cached(sec: int) -> str:
+    """ISO timestamp for a whole second; formatted once per second, not per request."""
+    return datetime.fromtimestamp(sec, tz=timezone.utc).isoformat()
+
+
 def _ok(data, meta: dict | None = None):
     return {
         "status": "ok",
-        "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+        "timestamp": _now_iso_cached(int(time.time())),
         "data": data,
         **(meta or {}),
     }
@@ -17,7 +17,8 @@ Layout:
   │ Full Market Table + Anomaly Alert Panel                  │
   └──────────────────────────────────────────────────────────┘
 
-Auto-refreshes every 60 seconds via st.rerun().
+Polls the ETL data version in a small fragment; the full page reruns only
+when new data has been loaded.
 """
 
 import time
@@ -38,8 +39,8 @@ logger = logging.getLogger(__name__)
 
 # ── Try imports ───────────────────────────────────────────────────────────────
 try:
+    import numpy as np
     import pandas as pd
-    import plotly.express as px
     import plotly.graph_objects as go
     _PLOTLY = True
 except ImportError:
@@ -47,13 +48,9 @@ except ImportError:
     st.error("Run: pip install plotly pandas streamlit")
     st.stop()
 
-from analysis import (
-    kpi_summary, top_gainers, top_market_cap,
-    volume_comparison, volatility_ranking,
-    detect_anomalies, price_history, get_market_df,
-)
+from analysis import DashboardBundle, dashboard_bundle, etl_version, get_history_df
 from load import get_row_count
-from config import DASHBOARD_REFRESH_SECONDS, ZSCORE_THRESHOLD
+from config import DASHBOARD_REFRESH_SECONDS, ZSCORE_THRESHOLD, ETL_INTERVAL_MINUTES
 
 # ── Auto-run ETL on first load ───────────────────────────────────────────────
 @st.cache_resource
@@ -97,8 +94,13 @@ PLOTLY_LAYOUT = dict(
     font=dict(family="monospace", color=C_TEXT, size=11),
     margin=dict(l=10, r=10, t=32, b=10),
     showlegend=False,
+    hovermode="x unified",     # one hover pass instead of per-trace lookups
+    uirevision="cryptex",      # keep zoom/pan across auto-refresh reruns
 )
 
+# No mode bar; charts resize with their container
+PLOTLY_CONFIG = {"displayModeBar": False, "responsive": True}
+
 # ── Custom CSS ────────────────────────────────────────────────────────────────
 st.markdown("""
 <style>
@@ -168,46 +170,30 @@ div[data-testid="metric-container"] { background: transparent; }
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-#  Data loading (cached, refreshes every 55s)
+#  Data loading (cached per ETL data version, at most one ETL cycle)
 # ══════════════════════════════════════════════════════════════════════════════
 
-@st.cache_data(ttl=55)
-def load_kpis() -> dict:
-    return kpi_summary()
-
-@st.cache_data(ttl=55)
-def load_market_df() -> pd.DataFrame:
-    try:
-        return get_market_df()
-    except Exception:
-        return pd.DataFrame()
-
-@st.cache_data(ttl=55)
-def load_volume() -> list[dict]:
-    return volume_comparison()
+CACHE_TTL = ETL_INTERVAL_MINUTES * 60
 
-@st.cache_data(ttl=55)
-def load_volatility() -> list[dict]:
-    return volatility_ranking(10)
+# cache_resource: the bundle is shared across sessions without a pickle round
+# trip per rerun, so its frames are treated as read-only below.
+@st.cache_resource(ttl=CACHE_TTL, max_entries=2)
+def load_all(version: str) -> DashboardBundle:
+    """One cached entry (and one snapshot read) per ETL data version.
+    Errors propagate, so a failed read is never cached under the version."""
+    return dashboard_bundle(10)
 
-@st.cache_data(ttl=55)
-def load_gainers() -> list[dict]:
-    return top_gainers(10)
+@st.cache_resource(ttl=CACHE_TTL, max_entries=200)
+def load_history(coin_id: str, version: str) -> pd.DataFrame:
+    # Typed frame straight from SQL: datetime64 timestamps, already oldest→newest
+    return get_history_df(coin_id, 100)
 
-@st.cache_data(ttl=55)
-def load_anomalies() -> list[dict]:
-    return detect_anomalies()
 
-@st.cache_data(ttl=55)
-def load_history(coin_id: str) -> list[dict]:
-    return price_history(coin_id, 100)
-
-@st.cache_data(ttl=55)
-def load_row_count() -> int:
+def current_version() -> str:
     try:
-        return get_row_count()
+        return etl_version()
     except Exception:
-        return 0
+        return ""
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -223,6 +209,17 @@ def fmt_usd(v, decimals=2) -> str:
     return f"${v:.{decimals}f}"
 
 
+_USD_MAGS     = np.array([1e12, 1e9, 1e6, 1e3, 1.0])
+_USD_SUFFIXES = np.array(["T", "B", "M", "K", ""])
+
+def fmt_usd_series(s: pd.Series) -> pd.Series:
+    """Vectorised fmt_usd for a whole column (same output, no per-row Python call)."""
+    v = s.fillna(0).to_numpy(dtype=np.float64)
+    idx = np.select([v >= m for m in _USD_MAGS[:-1]], range(len(_USD_MAGS) - 1), len(_USD_MAGS) - 1)
+    text = np.char.add(np.char.mod("$%.2f", v / _USD_MAGS[idx]), _USD_SUFFIXES[idx])
+    return pd.Series(text, index=s.index)
+
+
 def chg_color(v: float) -> str:
     return C_GREEN if v >= 0 else C_RED
 
@@ -249,6 +246,123 @@ def plotly_bar(df, x, y, title, color_col=None, color_pos=C_GREEN, color_neg=C_R
     return fig
 
 
+@st.cache_resource(ttl=CACHE_TTL, max_entries=2)
+def build_display_table(version: str) -> pd.DataFrame:
+    """Formatted market table, built once per data version rather than per rerun."""
+    market_df = load_all(version).market_df
+    display_cols = [c for c in [
+        "market_cap_rank","symbol","name","current_price",
+        "market_cap","total_volume","price_change_24h","volatility_score"
+    ] if c in market_df.columns]
+
+    df_display = market_df[display_cols].copy()
+    rename_map = {
+        "market_cap_rank":  "Rank",
+        "symbol":           "Symbol",
+        "name":             "Name",
+        "current_price":    "Price (USD)",
+        "market_cap":       "Market Cap",
+        "total_volume":     "Volume 24H",
+        "price_change_24h": "Chg 24H %",
+        "volatility_score": "Volatility Score",
+    }
+    df_display = df_display.rename(columns=rename_map)
+
+    # Format for display
+    if "Price (USD)" in df_display.columns:
+        df_display["Price (USD)"] = df_display["Price (USD)"].map("${:,.4f}".format)
+    if "Market Cap" in df_display.columns:
+        df_display["Market Cap"] = fmt_usd_series(df_display["Market Cap"])
+    if "Volume 24H" in df_display.columns:
+        df_display["Volume 24H"] = fmt_usd_series(df_display["Volume 24H"])
+    if "Chg 24H %" in df_display.columns:
+        chg = df_display["Chg 24H %"].to_numpy(dtype=np.float64)
+        df_display["Chg 24H %"] = np.char.mod("%+.2f%%", chg)
+    return df_display
+
+
+
+# Figures are built once per (data version, top_n) and shared; reruns only
+# re-serialise them in st.plotly_chart.
+@st.cache_resource(ttl=CACHE_TTL, max_entries=8)
+def mcap_figure(version: str, top_n: int) -> "go.Figure | None":
+    market_df = load_all(version).market_df
+    if market_df.empty:
+        return None
+    df_top = market_df.nlargest(top_n, "market_cap")[["symbol","market_cap_b"]]
+    fig = plotly_bar(df_top, "symbol", "market_cap_b", f"Market Cap — Top {top_n} (USD Billions)")
+    fig.update_traces(marker_color=C_ACCENT)
+    return fig
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=8)
+def gainers_figure(version: str, top_n: int) -> "go.Figure | None":
+    df_gain = load_all(version).gainers.head(top_n)
+    if df_gain.empty:
+        return None
+    fig = plotly_bar(
+        df_gain, "symbol", "price_change_24h",
+        f"24H Price Change % — Top {top_n}",
+        color_col="price_change_24h",
+    )
+    fig.add_hline(y=0, line_color="rgba(255,255,255,0.15)", line_width=1)
+    return fig
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=8)
+def volume_figure(version: str, top_n: int) -> "go.Figure | None":
+    df_vol = load_all(version).volume.head(top_n)
+    if df_vol.empty:
+        return None
+    fig = go.Figure(go.Bar(
+        x=df_vol["symbol"],
+        y=df_vol["volume_b"],
+        marker=dict(
+            color=df_vol["volume_b"],
+            colorscale=[[0,"#1a3a4f"],[0.5,"#00a8d6"],[1.0,C_ACCENT]],
+            showscale=False,
+        ),
+    ))
+    fig.update_layout(title="24H Volume (USD Billions)", **PLOTLY_LAYOUT)
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)")
+    return fig
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=8)
+def volatility_figure(version: str, top_n: int) -> "go.Figure | None":
+    df_vr = load_all(version).volatility.head(top_n)
+    if df_vr.empty:
+        return None
+    fig = go.Figure(go.Bar(
+        x=df_vr["symbol"],
+        y=df_vr["vs_b"],
+        marker=dict(
+            color=df_vr["vs_b"],
+            colorscale=[[0,"#3a1a2f"],[0.5,"#c800a8"],[1.0,C_YELLOW]],
+            showscale=False,
+        ),
+    ))
+    fig.update_layout(title="Volatility Score Ranking (|Δ%| × Volume)", **PLOTLY_LAYOUT)
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)")
+    return fig
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  Load data
+# ══════════════════════════════════════════════════════════════════════════════
+
+data_version = current_version()
+try:
+    bundle = load_all(data_version)
+    bundle_ok = True
+except Exception as exc:
+    logger.warning(f"Could not load dashboard data: {exc}")
+    # Not cached: the next rerun (new data, Force Refresh, any widget) tries again
+    st.warning("⚠️ Could not load dashboard data — try Force Refresh in a moment")
+    bundle, bundle_ok = DashboardBundle(), False
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  Sidebar
 # ══════════════════════════════════════════════════════════════════════════════
@@ -270,19 +384,29 @@ with st.sidebar:
 
     st.markdown("---")
     st.markdown("**Pipeline Info**")
-    row_count = load_row_count()
+    row_count = bundle.row_count
     st.metric("DB Records", f"{row_count:,}")
     st.metric("ETL Interval", "5 min")
     st.metric("Refresh", f"{refresh_interval}s")
 
     st.markdown("---")
     if st.button("🔄 Force Refresh", use_container_width=True):
-        st.cache_data.clear()
+        for loader in (load_all, load_history, build_display_table,
+                       mcap_figure, gainers_figure, volume_figure, volatility_figure):
+            loader.clear()
         st.rerun()
 
     st.markdown("---")
     st.caption("Built with: Python · PostgreSQL · CoinGecko · Streamlit · Plotly")
 
+# Only this fragment reruns on the timer; the page reruns when the data changed
+@st.fragment(run_every=refresh_interval)
+def watch_for_new_data():
+    if current_version() != data_version:
+        st.rerun()
+
+watch_for_new_data()
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  Main Dashboard
@@ -300,11 +424,10 @@ with col_ts:
         unsafe_allow_html=True
     )
 
-# ── Load data ─────────────────────────────────────────────────────────────────
-kpis      = load_kpis()
-market_df = load_market_df()
-gainers   = load_gainers()
-anomalies = load_anomalies()
+# ── Panel data ────────────────────────────────────────────────────────────────
+kpis      = bundle.kpis
+market_df = bundle.market_df
+anomalies = bundle.anomalies
 
 # ── KPI Cards ────────────────────────────────────────────────────────────────
 st.markdown('<div class="section-title">📊  KEY PERFORMANCE INDICATORS</div>', unsafe_allow_html=True)
@@ -355,11 +478,11 @@ with k4:
 
 
 # ── Anomaly Alert ─────────────────────────────────────────────────────────────
-if anomalies:
+if not anomalies.empty:
     st.markdown(f"""
     <div class="anomaly-alert">
         ⚠️  <b>ANOMALY DETECTED</b> — {len(anomalies)} coin(s) with |Z-score| ≥ {z_threshold}:
-        {" · ".join([f"{a['symbol']} ({a['anomaly_type']}, z={a['z_score']:+.2f})" for a in anomalies])}
+        {" · ".join([f"{a.symbol} ({a.anomaly_type}, z={a.z_score:+.2f})" for a in anomalies.itertuples()])}
     </div>""", unsafe_allow_html=True)
     st.markdown("")
 
@@ -369,25 +492,16 @@ st.markdown('<div class="section-title">📈  MARKET OVERVIEW</div>', unsafe_all
 ch1, ch2 = st.columns(2)
 
 with ch1:
-    if not market_df.empty:
-        df_top = market_df.nlargest(top_n, "market_cap")[["symbol","market_cap"]].copy()
-        df_top["market_cap_B"] = df_top["market_cap"] / 1e9
-        fig = plotly_bar(df_top, "symbol", "market_cap_B", f"Market Cap — Top {top_n} (USD Billions)")
-        fig.update_traces(marker_color=C_ACCENT)
-        st.plotly_chart(fig, use_container_width=True)
+    fig = mcap_figure(data_version, top_n) if bundle_ok else None
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
     else:
         st.info("No market data yet — run the ETL pipeline first.\n\n`python etl_pipeline.py --once`")
 
 with ch2:
-    df_gain = pd.DataFrame(gainers[:top_n]) if gainers else pd.DataFrame()
-    if not df_gain.empty:
-        fig = plotly_bar(
-            df_gain, "symbol", "price_change_24h",
-            f"24H Price Change % — Top {top_n}",
-            color_col="price_change_24h",
-        )
-        fig.add_hline(y=0, line_color="rgba(255,255,255,0.15)", line_width=1)
-        st.plotly_chart(fig, use_container_width=True)
+    fig = gainers_figure(data_version, top_n) if bundle_ok else None
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
     else:
         st.info("Awaiting data...")
 
@@ -397,44 +511,16 @@ st.markdown('<div class="section-title">📊  VOLUME & VOLATILITY</div>', unsafe
 ch3, ch4 = st.columns(2)
 
 with ch3:
-    vol_data = load_volume()
-    df_vol = pd.DataFrame(vol_data[:top_n]) if vol_data else pd.DataFrame()
-    if not df_vol.empty:
-        df_vol["volume_B"] = df_vol["total_volume"] / 1e9
-        fig = go.Figure(go.Bar(
-            x=df_vol["symbol"],
-            y=df_vol["volume_B"],
-            marker=dict(
-                color=df_vol["volume_B"],
-                colorscale=[[0,"#1a3a4f"],[0.5,"#00a8d6"],[1.0,C_ACCENT]],
-                showscale=False,
-            ),
-        ))
-        fig.update_layout(title="24H Volume (USD Billions)", **PLOTLY_LAYOUT)
-        fig.update_xaxes(showgrid=False)
-        fig.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)")
-        st.plotly_chart(fig, use_container_width=True)
+    fig = volume_figure(data_version, top_n) if bundle_ok else None
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
     else:
         st.info("Awaiting data...")
 
 with ch4:
-    vr_data = load_volatility()
-    df_vr = pd.DataFrame(vr_data[:top_n]) if vr_data else pd.DataFrame()
-    if not df_vr.empty:
-        df_vr["vs_B"] = df_vr["volatility_score"] / 1e9
-        fig = go.Figure(go.Bar(
-            x=df_vr["symbol"],
-            y=df_vr["vs_B"],
-            marker=dict(
-                color=df_vr["vs_B"],
-                colorscale=[[0,"#3a1a2f"],[0.5,"#c800a8"],[1.0,C_YELLOW]],
-                showscale=False,
-            ),
-        ))
-        fig.update_layout(title="Volatility Score Ranking (|Δ%| × Volume)", **PLOTLY_LAYOUT)
-        fig.update_xaxes(showgrid=False)
-        fig.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)")
-        st.plotly_chart(fig, use_container_width=True)
+    fig = volatility_figure(data_version, top_n) if bundle_ok else None
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
     else:
         st.info("Awaiting data...")
 
@@ -448,18 +534,17 @@ else:
     coin_options = ["bitcoin", "ethereum", "binancecoin"]
 
 selected_coin = st.selectbox("Select Coin", coin_options, index=0)
-hist = load_history(selected_coin)
-
-if hist:
-    df_hist = pd.DataFrame(hist)
-    if "extracted_at" in df_hist.columns:
-        df_hist["extracted_at"] = pd.to_datetime(df_hist["extracted_at"])
-        df_hist = df_hist.sort_values("extracted_at")
+try:
+    hist = load_history(selected_coin, data_version)
+except Exception as exc:
+    logger.warning(f"Could not load history for {selected_coin}: {exc}")
+    hist = pd.DataFrame()
 
+if not hist.empty:
     fig_hist = go.Figure()
-    fig_hist.add_trace(go.Scatter(
-        x=df_hist["extracted_at"],
-        y=df_hist["current_price"],
+    fig_hist.add_trace(go.Scattergl(
+        x=hist["extracted_at"],
+        y=hist["current_price"],
         mode="lines",
         line=dict(color=C_ACCENT, width=2),
         fill="tozeroy",
@@ -473,7 +558,7 @@ if hist:
     )
     fig_hist.update_xaxes(showgrid=False, tickfont_size=9)
     fig_hist.update_yaxes(showgrid=True, gridcolor="rgba(255,255,255,0.05)", tickprefix="$")
-    st.plotly_chart(fig_hist, use_container_width=True)
+    st.plotly_chart(fig_hist, use_container_width=True, config=PLOTLY_CONFIG)
 else:
     st.info(f"No history yet for '{selected_coin}' — ETL runs every 5 minutes")
 
@@ -482,43 +567,15 @@ else:
 st.markdown('<div class="section-title">🗂  FULL MARKET TABLE</div>', unsafe_allow_html=True)
 
 if not market_df.empty:
-    display_cols = [c for c in [
-        "market_cap_rank","symbol","name","current_price",
-        "market_cap","total_volume","price_change_24h","volatility_score"
-    ] if c in market_df.columns]
-
-    df_display = market_df[display_cols].copy()
-    rename_map = {
-        "market_cap_rank":  "Rank",
-        "symbol":           "Symbol",
-        "name":             "Name",
-        "current_price":    "Price (USD)",
-        "market_cap":       "Market Cap",
-        "total_volume":     "Volume 24H",
-        "price_change_24h": "Chg 24H %",
-        "volatility_score": "Volatility Score",
-    }
-    df_display = df_display.rename(columns=rename_map)
-
-    # Format for display
-    if "Price (USD)" in df_display.columns:
-        df_display["Price (USD)"] = df_display["Price (USD)"].apply(lambda x: f"${x:,.4f}")
-    if "Market Cap" in df_display.columns:
-        df_display["Market Cap"] = df_display["Market Cap"].apply(fmt_usd)
-    if "Volume 24H" in df_display.columns:
-        df_display["Volume 24H"] = df_display["Volume 24H"].apply(fmt_usd)
-    if "Chg 24H %" in df_display.columns:
-        df_display["Chg 24H %"] = df_display["Chg 24H %"].apply(lambda x: f"{x:+.2f}%")
-
-    st.dataframe(df_display, use_container_width=True, hide_index=True, height=420)
+    st.dataframe(build_display_table(data_version), use_container_width=True, hide_index=True, height=420)
 else:
     st.info("Run `python etl_pipeline.py --once` to populate data.")
 
 
 # ── Anomaly Detail Table ──────────────────────────────────────────────────────
-if anomalies:
+if not anomalies.empty:
     st.markdown('<div class="section-title">⚠️  ANOMALY DETAIL</div>', unsafe_allow_html=True)
-    df_anom = pd.DataFrame(anomalies)
+    df_anom = anomalies.copy()
     df_anom.columns = [c.replace("_"," ").title() for c in df_anom.columns]
     st.dataframe(df_anom, use_container_width=True, hide_index=True)
 
@@ -528,24 +585,8 @@ st.markdown("---")
 st.markdown(
     f"<div style='text-align:center;font-family:monospace;font-size:10px;color:{C_MUTED}'>"
     f"CRYPTEX Analytics Platform · ETL + PostgreSQL + CoinGecko + Streamlit · "
-    f"Auto-refresh in {refresh_interval}s · {row_count:,} DB records"
+    f"New-data check every {refresh_interval}s · {row_count:,} DB records"
     f"</div>",
     unsafe_allow_html=True
 )
 
-
-# ══════════════════════════════════════════════════════════════════════════════
-#  Auto-refresh countdown
-# ══════════════════════════════════════════════════════════════════════════════
-placeholder = st.empty()
-for remaining in range(refresh_interval, 0, -1):
-    placeholder.markdown(
-        f"<div style='text-align:center;font-family:monospace;font-size:10px;"
-        f"color:{C_MUTED};padding:4px'>🔄 Refreshing in {remaining}s</div>",
-        unsafe_allow_html=True
-    )
-    time.sleep(1)
-
-placeholder.empty()
-st.cache_data.clear()
-st.rerun()
@@ -8,16 +8,21 @@ Responsibilities:
   • Offer a lightweight SQLite fallback for local development
 
 Design choices:
-  • SimpleConnectionPool over thread-local connections for thread safety
+  • ThreadedConnectionPool so Streamlit sessions and the ETL share it safely
   • TIMESTAMPTZ for timezone-aware storage
+  • DOUBLE PRECISION market figures — read as native floats, not Decimal
   • Composite index on (coin_id, extracted_at) for time-series queries
   • UPSERT key on (coin_id, extracted_at) prevents duplicate runs
 """
 
+import atexit
 import logging
+import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
-from datetime import datetime, timezone
+from datetime import datetime
 from pathlib import Path
 from typing import Generator
 
@@ -33,6 +38,14 @@ except ImportError:
     POSTGRES_AVAILABLE = False
     logger.warning("psycopg2 not installed — using SQLite fallback")
 
+if POSTGRES_AVAILABLE:
+    # Tables created before the DOUBLE PRECISION schema still hold NUMERIC;
+    # decode those as float rather than Decimal so frames stay float64.
+    psycopg2.extensions.register_type(psycopg2.extensions.new_type(
+        (1700,), "NUMERIC_AS_FLOAT",
+        lambda value, cur: float(value) if value is not None else None,
+    ))
+
 from config import DB_CONFIG, BASE_DIR
 
 
@@ -47,12 +60,12 @@ CREATE TABLE IF NOT EXISTS crypto_market (
     coin_id           VARCHAR(100)     NOT NULL,          -- e.g. "bitcoin"
     symbol            VARCHAR(20)      NOT NULL,          -- e.g. "btc"
     name              VARCHAR(200)     NOT NULL,          -- e.g. "Bitcoin"
-    current_price     NUMERIC(24, 8)   NOT NULL,
-    market_cap        NUMERIC(30, 2),
-    total_volume      NUMERIC(30, 2),
-    price_change_24h  NUMERIC(10, 4),                     -- percentage
+    current_price     DOUBLE PRECISION NOT NULL,
+    market_cap        DOUBLE PRECISION,
+    total_volume      DOUBLE PRECISION,
+    price_change_24h  DOUBLE PRECISION,                   -- percentage
     market_cap_rank   INTEGER,
-    volatility_score  NUMERIC(40, 4),                     -- abs(price_change) * volume
+    volatility_score  DOUBLE PRECISION,                   -- abs(price_change) * volume
     extracted_at      TIMESTAMPTZ      NOT NULL DEFAULT NOW(),
 
     -- Prevent duplicate ETL runs per coin per timestamp bucket
@@ -63,13 +76,20 @@ CREATE TABLE IF NOT EXISTS crypto_market (
 CREATE INDEX IF NOT EXISTS idx_coin_id
     ON crypto_market (coin_id);
 
--- Index for time-range queries / dashboard filtering
-CREATE INDEX IF NOT EXISTS idx_extracted_at
-    ON crypto_market (extracted_at DESC);
-
--- Composite index for time-series per coin (most common query pattern)
-CREATE INDEX IF NOT EXISTS idx_coin_ts
-    ON crypto_market (coin_id, extracted_at DESC);
+-- Index for time-range queries / dashboard filtering. Kept as a B-tree (not
+-- BRIN): MAX(extracted_at) and the latest-snapshot equality lookup need it.
+-- The trailing rank column returns a snapshot already in market_cap_rank
+-- order (no sort node); it replaces the old single-column idx_extracted_at.
+DROP INDEX IF EXISTS idx_extracted_at;
+CREATE INDEX IF NOT EXISTS idx_latest_rank
+    ON crypto_market (extracted_at DESC, market_cap_rank);
+
+-- Composite index for time-series per coin (most common query pattern).
+-- Covers price_history's columns so it can be answered by index-only scans.
+DROP INDEX IF EXISTS idx_coin_ts;
+CREATE INDEX IF NOT EXISTS idx_coin_ts_cover
+    ON crypto_market (coin_id, extracted_at DESC)
+    INCLUDE (current_price, price_change_24h, total_volume);
 
 -- Index for ranking queries
 CREATE INDEX IF NOT EXISTS idx_market_cap_rank
@@ -93,11 +113,13 @@ CREATE TABLE IF NOT EXISTS crypto_market (
     UNIQUE(coin_id, extracted_at)
 );
 CREATE INDEX IF NOT EXISTS idx_coin_id      ON crypto_market (coin_id);
-CREATE INDEX IF NOT EXISTS idx_extracted_at ON crypto_market (extracted_at DESC);
+DROP INDEX IF EXISTS idx_extracted_at;
+CREATE INDEX IF NOT EXISTS idx_latest_rank  ON crypto_market (extracted_at DESC, market_cap_rank);
 CREATE INDEX IF NOT EXISTS idx_coin_ts      ON crypto_market (coin_id, extracted_at DESC);
 """
 
 SQLITE_PATH = BASE_DIR / "data" / "crypto_analytics.db"
+SQLITE_POOL_SIZE = 4     # idle connections kept open; extras are closed on release
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -105,39 +127,49 @@ SQLITE_PATH = BASE_DIR / "data" / "crypto_analytics.db"
 # ══════════════════════════════════════════════════════════════════════════════
 
 class PostgresManager:
-    """Thread-safe connection pool wrapping psycopg2."""
+    """Thread-safe connection pool wrapping psycopg2 (one pool per process)."""
 
-    _pool: "psycopg2.pool.SimpleConnectionPool | None" = None
+    # Class-level so every manager instance shares a single pool
+    _pool: "psycopg2.pool.ThreadedConnectionPool | None" = None
+    _lock = threading.Lock()
 
-    def __init__(self, minconn: int = 1, maxconn: int = 10):
+    def __init__(self, minconn: int = 1, maxconn: int = 2 * (os.cpu_count() or 5)):
         self.minconn = minconn
         self.maxconn = maxconn
 
     def init_pool(self) -> None:
         if not POSTGRES_AVAILABLE:
             raise RuntimeError("psycopg2 not installed")
-        if self._pool is None:
-            self._pool = psycopg2.pool.SimpleConnectionPool(
-                self.minconn,
-                self.maxconn,
-                **DB_CONFIG
-            )
-            logger.info(
-                "PostgreSQL pool created (%d–%d connections)", self.minconn, self.maxconn
-            )
+        cls = type(self)
+        if cls._pool is not None:
+            return
+        with cls._lock:
+            if cls._pool is None:
+                # SimpleConnectionPool is not safe to share between threads
+                cls._pool = psycopg2.pool.ThreadedConnectionPool(
+                    self.minconn,
+                    self.maxconn,
+                    **DB_CONFIG
+                )
+                logger.info(
+                    "PostgreSQL pool created (%d–%d connections)", self.minconn, self.maxconn
+                )
 
     def close_pool(self) -> None:
-        if self._pool:
-            self._pool.closeall()
-            self._pool = None
-            logger.info("PostgreSQL pool closed")
+        cls = type(self)
+        with cls._lock:
+            if cls._pool:
+                cls._pool.closeall()
+                cls._pool = None
+                logger.info("PostgreSQL pool closed")
 
     @contextmanager
     def get_connection(self) -> Generator:
         """Yield a connection, return it to pool on exit."""
         if self._pool is None:
             self.init_pool()
-        conn = self._pool.getconn()
+        pool = self._pool
+        conn = pool.getconn()
         try:
             yield conn
             conn.commit()
@@ -145,7 +177,7 @@ class PostgresManager:
             conn.rollback()
             raise
         finally:
-            self._pool.putconn(conn)
+            pool.putconn(conn)
 
     @contextmanager
     def get_cursor(self, cursor_factory=None):
@@ -178,23 +210,65 @@ class PostgresManager:
 #  SQLite Fallback Manager
 # ══════════════════════════════════════════════════════════════════════════════
 
+# extracted_at is stored as ISO-8601 text ("…T…+00:00"); binding datetimes via a
+# C-side adapter keeps that format without rebuilding row tuples in Python.
+sqlite3.register_adapter(datetime, datetime.isoformat)
+
+
 class SQLiteManager:
     """SQLite backend for local development / CI without Postgres."""
 
     def __init__(self, path: Path = SQLITE_PATH):
         self.path = path
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Small LIFO pool of idle connections; opening one costs a file open + PRAGMAs.
+        # Bounded, so short-lived threads (Streamlit reruns) can't pile them up.
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=SQLITE_POOL_SIZE)
+        atexit.register(self.close)
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn = sqlite3.connect(
+            str(self.path), check_same_thread=False,
+            cached_statements=256,              # reuse parsed analytics SQL
+        )
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")   # ~64 MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+        conn.execute("PRAGMA temp_store=MEMORY")
         return conn
 
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:          # abandoned mid-transaction (e.g. GeneratorExit)
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        """Close every idle pooled connection (registered with atexit)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.execute("PRAGMA optimize")   # refresh planner stats when stale
+                conn.close()
+            except sqlite3.Error:
+                pass
+
     @contextmanager
     def get_connection(self) -> Generator:
-        conn = self._connect()
+        conn = self._acquire()
         try:
             yield conn
             conn.commit()
@@ -202,7 +276,7 @@ class SQLiteManager:
             conn.rollback()
             raise
         finally:
-            conn.close()
+            self._release(conn)
 
     @contextmanager
     def get_cursor(self, **_):
@@ -244,6 +318,7 @@ def get_db_manager(force_sqlite: bool = False):
                 raise ConnectionError("Probe failed")
         except Exception as exc:
             logger.warning("Postgres unavailable (%s) — falling back to SQLite", exc)
+            mgr.close_pool()
             mgr = SQLiteManager()
 
     mgr.create_schema()
@@ -255,12 +330,18 @@ def get_db_manager(force_sqlite: bool = False):
 # ══════════════════════════════════════════════════════════════════════════════
 
 _db_manager = None
+_db_manager_lock = threading.Lock()
 
 def db() -> "PostgresManager | SQLiteManager":
-    """Return the module-level DB manager singleton."""
+    """
+    Return the module-level DB manager singleton. Streamlit reruns and sessions
+    all share it; the lock stops concurrent first calls from each building one.
+    """
     global _db_manager
     if _db_manager is None:
-        _db_manager = get_db_manager()
+        with _db_manager_lock:
+            if _db_manager is None:
+                _db_manager = get_db_manager()
     return _db_manager
 
 
@@ -3,41 +3,38 @@ etl_pipeline.py — ETL Orchestrator
 =====================================
 Responsibilities:
   • Compose extract → transform → load into one atomic pipeline run
-  • Schedule runs every N minutes via APScheduler (or fallback loop)
+  • Schedule runs every N minutes on a single asyncio event loop
   • Structured logging with per-run summary stats
   • Graceful shutdown on SIGINT / SIGTERM
   • Expose run_once() for ad-hoc / testing calls
 
 Design choices:
-  • APScheduler BackgroundScheduler runs in its own thread
+  • Drift-corrected ticks from the loop's monotonic clock; the blocking
+    run_once() executes in a worker thread via asyncio.to_thread
+  • Signal handlers set a stop event — no keep-alive thread or idle wakeups
   • run_once() returns PipelineResult so callers can inspect success/failure
   • All exceptions caught at orchestrator level — pipeline never crashes scheduler
-  • Consecutive failure counter with circuit-breaker at 5 failures
+  • Circuit breaker opens after 5 consecutive failures, then probes again
+    after a cooldown (half-open) that doubles on each failed probe
+  • Last successful PipelineResult kept for callers while the breaker is open
 """
 
+import asyncio
 import logging
 import signal
 import sys
 import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Literal, Optional
 
 logger = logging.getLogger(__name__)
 
-# ─── APScheduler (optional) ──────────────────────────────────────────────────
-try:
-    from apscheduler.schedulers.background import BackgroundScheduler
-    from apscheduler.triggers.interval import IntervalTrigger
-    _APScheduler = True
-except ImportError:
-    _APScheduler = False
-    logger.info("APScheduler not installed — using built-in sleep loop")
-
 from config import ETL_INTERVAL_MINUTES
 from extract import extract
 from transform import transform, summarize
 from load import load, LoadResult
+from analysis import mark_etl_complete
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -68,6 +65,14 @@ class PipelineResult:
 #  Run once
 # ══════════════════════════════════════════════════════════════════════════════
 
+_last_good: Optional[PipelineResult] = None
+
+
+def get_last_good() -> Optional[PipelineResult]:
+    """Most recent successful run in this process, or None if there hasn't been one."""
+    return _last_good
+
+
 def run_once() -> PipelineResult:
     """
     Execute one full ETL cycle: extract → transform → load.
@@ -75,6 +80,7 @@ def run_once() -> PipelineResult:
     Returns PipelineResult regardless of success/failure.
     Never raises — exceptions are captured in result.error.
     """
+    global _last_good
     result = PipelineResult()
     t0 = time.perf_counter()
 
@@ -102,8 +108,10 @@ def run_once() -> PipelineResult:
         load_result = load(coins)
         result.load_result = load_result
         logger.info("   ✓ %s", load_result)
+        mark_etl_complete(extracted_at)
 
         result.success = True
+        _last_good = result
 
     except Exception as exc:
         result.error = str(exc)
@@ -117,18 +125,26 @@ def run_once() -> PipelineResult:
     return result
 
 
+_SUMMARY_FMT = (
+    "   Summary: mcap=$%s  gainers=%d  losers=%d  "
+    "top_gainer=%s(+%.2f%%)  most_volatile=%s"
+)
+
+
 def _log_summary(s: dict) -> None:
-    if not s:
+    # Skip the formatting work entirely when INFO is filtered out
+    if not s or not logger.isEnabledFor(logging.INFO):
         return
+    # summarize() always returns the full key set for a non-empty batch
+    top_gainer = s["top_gainer"]
     logger.info(
-        "   Summary: mcap=$%s  gainers=%d  losers=%d  "
-        "top_gainer=%s(+%.2f%%)  most_volatile=%s",
-        f"{s.get('total_market_cap', 0):,.0f}",
-        s.get("gainers", 0),
-        s.get("losers", 0),
-        s.get("top_gainer", {}).get("coin", "?"),
-        s.get("top_gainer", {}).get("change", 0),
-        s.get("most_volatile", {}).get("coin", "?"),
+        _SUMMARY_FMT,
+        f"{s['total_market_cap']:,.0f}",
+        s["gainers"],
+        s["losers"],
+        top_gainer["coin"],
+        top_gainer["change"],
+        s["most_volatile"]["coin"],
     )
 
 
@@ -136,55 +152,114 @@ def _log_summary(s: dict) -> None:
 #  Scheduler
 # ══════════════════════════════════════════════════════════════════════════════
 
-_consecutive_failures = 0
 _CIRCUIT_BREAKER_LIMIT = 5
+_BREAKER_MAX_COOLDOWN_S = 30 * 60
 
 
-def _scheduled_job() -> None:
-    """Wrapper called by scheduler — manages circuit breaker."""
-    global _consecutive_failures
+@dataclass
+class CircuitBreaker:
+    """
+    closed → (N failures) → open → (cooldown elapsed) → half_open
+    half_open: one probe run; success → closed, failure → open with 2× cooldown.
+    """
+    failure_limit: int   = _CIRCUIT_BREAKER_LIMIT
+    base_cooldown: float = ETL_INTERVAL_MINUTES * 60
+    max_cooldown:  float = _BREAKER_MAX_COOLDOWN_S
+    state:     Literal["closed", "open", "half_open"] = "closed"
+    failures:  int   = 0
+    cooldown:  float = 0.0
+    open_until: float = 0.0
+    transitions: dict = field(default_factory=dict)   # "closed->open" → count
+
+    def __post_init__(self) -> None:
+        self.cooldown = self.cooldown or self.base_cooldown
+
+    def _transition(self, new_state: str) -> None:
+        key = f"{self.state}->{new_state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("Circuit breaker %s (failures=%d, cooldown=%.0fs)",
+                       key, self.failures, self.cooldown)
+        self.state = new_state
+
+    def _open(self) -> None:
+        self.open_until = time.monotonic() + self.cooldown
+        self._transition("open")
+
+    def allow(self) -> bool:
+        """True if a run may proceed now (possibly as the half-open probe)."""
+        if self.state == "open":
+            if time.monotonic() < self.open_until:
+                return False
+            self._transition("half_open")
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        if self.state != "closed":
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open":
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == "closed" and self.failures >= self.failure_limit:
+            self._open()
+
+
+_breaker = CircuitBreaker()
+
+
+def _scheduled_job() -> Optional[PipelineResult]:
+    """
+    Wrapper called by scheduler — manages circuit breaker.
+    While the breaker is open the run is skipped and the last good result returned.
+    """
+    if not _breaker.allow():
+        logger.info("Circuit breaker open — skipping run (retry in %.0fs)",
+                    _breaker.open_until - time.monotonic())
+        return _last_good
     result = run_once()
     if result.success:
-        _consecutive_failures = 0
+        _breaker.record_success()
     else:
-        _consecutive_failures += 1
-        if _consecutive_failures >= _CIRCUIT_BREAKER_LIMIT:
-            logger.critical(
-                "Circuit breaker tripped: %d consecutive failures. "
-                "Stopping scheduler. Investigate and restart.",
-                _consecutive_failures,
-            )
-            # Stop scheduler from within the job
-            _stop_scheduler()
-
-
-_scheduler: Optional["BackgroundScheduler"] = None
-
-def _stop_scheduler():
-    global _scheduler
-    if _scheduler and _scheduler.running:
-        _scheduler.shutdown(wait=False)
-        logger.info("APScheduler stopped")
-
+        _breaker.record_failure()
+    return result
 
-def _handle_signal(sig, frame):
-    logger.info("Signal %d received — shutting down ETL pipeline", sig)
-    _stop_scheduler()
-    sys.exit(0)
 
+async def _scheduler_loop(interval_s: float, run_immediately: bool) -> None:
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
 
-# ══════════════════════════════════════════════════════════════════════════════
-#  Fallback: simple sleep loop (no APScheduler)
-# ══════════════════════════════════════════════════════════════════════════════
+    def _request_stop(sig: int) -> None:
+        logger.info("Signal %d received — shutting down ETL pipeline", sig)
+        stop.set()
 
-def _run_loop(interval_minutes: int) -> None:
-    """Simple blocking loop as APScheduler alternative."""
-    interval_s = interval_minutes * 60
-    logger.info("Starting sleep-loop scheduler (interval=%dm)", interval_minutes)
-    while True:
-        _scheduled_job()
-        logger.info("Next run in %d minutes — sleeping...", interval_minutes)
-        time.sleep(interval_s)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, _request_stop, sig)
+        except (NotImplementedError, RuntimeError):
+            pass    # Windows: Ctrl+C surfaces as KeyboardInterrupt instead
+
+    # Ticks are anchored to a monotonic base so run time doesn't accumulate as drift
+    next_tick = loop.time() if run_immediately else loop.time() + interval_s
+    while not stop.is_set():
+        delay = next_tick - loop.time()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+        await asyncio.to_thread(_scheduled_job)
+
+        next_tick += interval_s
+        now = loop.time()
+        while next_tick <= now:     # a run overran the interval — skip missed ticks
+            next_tick += interval_s
+        logger.info("Next run in %.0fs", next_tick - now)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -193,50 +268,18 @@ def _run_loop(interval_minutes: int) -> None:
 
 def start(interval_minutes: int = ETL_INTERVAL_MINUTES, run_immediately: bool = True) -> None:
     """
-    Start the ETL scheduler.
+    Start the ETL scheduler. Blocks until SIGINT/SIGTERM.
 
     Args:
         interval_minutes: How often to run the pipeline.
-        run_immediately:  If True, execute one run before scheduling.
+        run_immediately:  If True, execute one run before the first interval.
     """
-    global _scheduler
-
-    signal.signal(signal.SIGINT,  _handle_signal)
-    signal.signal(signal.SIGTERM, _handle_signal)
-
-    logger.info(
-        "ETL Orchestrator starting | interval=%dm | backend=%s",
-        interval_minutes,
-        "APScheduler" if _APScheduler else "sleep-loop",
-    )
-
-    if run_immediately:
-        logger.info("Executing immediate first run...")
-        _scheduled_job()
-
-    if _APScheduler:
-        _scheduler = BackgroundScheduler(timezone="UTC")
-        _scheduler.add_job(
-            _scheduled_job,
-            trigger=IntervalTrigger(minutes=interval_minutes),
-            id="etl_pipeline",
-            name="Crypto ETL",
-            replace_existing=True,
-            misfire_grace_time=60,
-        )
-        _scheduler.start()
-        logger.info(
-            "APScheduler running (next run in ~%d min) — press Ctrl+C to stop",
-            interval_minutes,
-        )
-        try:
-            while True:
-                time.sleep(30)
-        except (KeyboardInterrupt, SystemExit):
-            _stop_scheduler()
-    else:
-        # Blocking loop
-        _run_loop(interval_minutes)
+    logger.info("ETL Orchestrator starting | interval=%dm | backend=asyncio", interval_minutes)
+    try:
+        asyncio.run(_scheduler_loop(interval_minutes * 60, run_immediately))
+    except KeyboardInterrupt:
+        pass
+    logger.info("ETL scheduler stopped")
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -4,21 +4,33 @@ extract.py — ETL Extract Layer
 Responsibilities:
   • Fetch top-N coins from CoinGecko /coins/markets endpoint
   • Validate response schema (required fields, types)
-  • Retry with exponential backoff on transient errors
-  • Save raw JSON snapshots to raw_data/ for audit/replay
+  • Retry with decorrelated-jitter backoff, honouring Retry-After on 429/503
+  • Save raw JSON snapshots (gzip) to raw_data/ for audit/replay
   • Return a typed list of raw dicts for the transform layer
 
 Design choices:
   • httpx over requests for connection pooling & timeout control
+  • One keep-alive client per process (HTTP/2 when `h2` is installed)
+  • Conditional GET (ETag / Last-Modified): a 304 reuses the last parsed page
   • Pydantic for response validation (catches API drift early)
-  • Raw JSON saved per-run with ISO timestamp filename
+  • Raw JSON saved per-run with ISO timestamp filename, gzip level 1;
+    an unchanged payload only writes a small .ref pointer to the previous file
+  • Snapshot writes run on a single background thread, off the extract path
   • Structured logging at every decision point
 """
 
+import atexit
+import gzip
+import hashlib
 import json
 import logging
+import math
+import random
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import Any, Optional
 
@@ -34,9 +46,22 @@ except ImportError:
     _HTTP_BACKEND = "urllib"
     logger.info("httpx not installed — using urllib fallback")
 
+try:
+    import orjson
+    _ORJSON = True
+except ImportError:
+    _ORJSON = False
+
+try:
+    import h2  # noqa: F401  (enables httpx's HTTP/2 transport)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 # ─── Try pydantic for validation ─────────────────────────────────────────────
 try:
-    from pydantic import BaseModel, validator, ValidationError
+    from pydantic import TypeAdapter, ValidationError
+    from typing_extensions import TypedDict
     _PYDANTIC = True
 except ImportError:
     _PYDANTIC = False
@@ -53,7 +78,9 @@ from config import (
 # ══════════════════════════════════════════════════════════════════════════════
 
 if _PYDANTIC:
-    class CoinRaw(BaseModel):
+    # A TypedDict schema is validated entirely inside pydantic-core and yields
+    # plain dicts, so there is no per-field Python validator or model_dump().
+    class CoinRaw(TypedDict):
         id:                         str
         symbol:                     str
         name:                       str
@@ -63,22 +90,27 @@ if _PYDANTIC:
         price_change_percentage_24h: Optional[float]
         market_cap_rank:            Optional[int]
 
-        # Coerce None → 0.0 for numeric fields so transform layer never sees None
-        @validator("current_price", "market_cap", "total_volume",
-                   "price_change_percentage_24h", pre=True, always=True)
-        def coerce_float(cls, v):
-            return float(v) if v is not None else 0.0
+    _COIN_ADAPTER      = TypeAdapter(CoinRaw)
+    _COIN_LIST_ADAPTER = TypeAdapter(list[CoinRaw])
+
+_FLOAT_FIELDS = ("current_price", "market_cap", "total_volume", "price_change_percentage_24h")
 
-        @validator("market_cap_rank", pre=True, always=True)
-        def coerce_int(cls, v):
-            return int(v) if v is not None else 9999
 
+def _fill_nulls(coin: dict) -> dict:
+    """Coerce None → 0.0 / 9999 so the transform layer never sees None."""
+    for k in _FLOAT_FIELDS:
+        if coin[k] is None:
+            coin[k] = 0.0
+    if coin["market_cap_rank"] is None:
+        coin["market_cap_rank"] = 9999
+    return coin
 
-REQUIRED_KEYS = {
+
+REQUIRED_KEYS = frozenset({
     "id", "symbol", "name", "current_price",
     "market_cap", "total_volume",
     "price_change_percentage_24h", "market_cap_rank",
-}
+})
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -92,29 +124,85 @@ def _build_headers() -> dict:
     return headers
 
 
-def _build_url() -> str:
+PER_PAGE_MAX = 250   # CoinGecko's /coins/markets page-size ceiling
+
+
+def _page_count() -> int:
+    return max(1, math.ceil(TOP_N_COINS / PER_PAGE_MAX))
+
+
+def _build_url(page: int = 1) -> str:
     params = (
         f"vs_currency={COINS_VS}"
         f"&order=market_cap_desc"
-        f"&per_page={TOP_N_COINS}"
-        f"&page=1"
+        f"&per_page={min(TOP_N_COINS, PER_PAGE_MAX)}"
+        f"&page={page}"
         f"&sparkline=false"
         f"&price_change_percentage=24h"
     )
     return f"{COINGECKO_BASE}/coins/markets?{params}"
 
 
+# URL and headers depend only on config, so build them once at import
+_URLS    = tuple(_build_url(p) for p in range(1, _page_count() + 1))
+_HEADERS = _build_headers()
+
+
+_client: "httpx.Client | None" = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> "httpx.Client":
+    """Process-wide keep-alive client, so runs after the first skip the TCP/TLS handshake."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=REQUEST_TIMEOUT,
+                    follow_redirects=True,
+                    http2=_HTTP2,
+                    limits=httpx.Limits(max_keepalive_connections=8),
+                )
+    return _client
+
+
+def _loads(raw: bytes) -> Any:
+    """Parse JSON straight from bytes (orjson when available) — no str decode pass."""
+    return orjson.loads(raw) if _ORJSON else json.loads(raw)
+
+
+# url → (conditional request headers, parsed body) from the last 200 response
+_conditional_cache: dict[str, tuple[dict, Any]] = {}
+
+
 def _fetch_httpx(url: str, headers: dict) -> list[dict]:
-    with httpx.Client(timeout=REQUEST_TIMEOUT, follow_redirects=True) as client:
-        resp = client.get(url, headers=headers)
-        resp.raise_for_status()
-        return resp.json()
+    cached = _conditional_cache.get(url)
+    if cached is not None:
+        headers = {**headers, **cached[0]}
+    resp = _get_client().get(url, headers=headers)
+    if resp.status_code == 304 and cached is not None:
+        logger.debug("304 Not Modified — reusing cached body for %s", url)
+        return cached[1]
+    resp.raise_for_status()
+    data = _loads(resp.content)
+
+    validators = {}
+    if etag := resp.headers.get("etag"):
+        validators["If-None-Match"] = etag
+    if last_modified := resp.headers.get("last-modified"):
+        validators["If-Modified-Since"] = last_modified
+    if validators:
+        _conditional_cache[url] = (validators, data)
+    else:
+        _conditional_cache.pop(url, None)
+    return data
 
 
 def _fetch_urllib(url: str, headers: dict) -> list[dict]:
     req = urllib.request.Request(url, headers=headers)
     with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
-        return json.loads(resp.read().decode())
+        return _loads(resp.read())
 
 
 def _http_get(url: str, headers: dict) -> list[dict]:
@@ -123,42 +211,109 @@ def _http_get(url: str, headers: dict) -> list[dict]:
     return _fetch_urllib(url, headers)
 
 
+RETRY_SLEEP_CAP = 60.0   # upper bound for jittered backoff (seconds)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (429/503 Retry-After), else None."""
+    response = getattr(exc, "response", None)      # httpx.HTTPStatusError
+    if response is not None:
+        status, hdrs = response.status_code, response.headers
+    elif hasattr(exc, "code") and hasattr(exc, "headers"):   # urllib HTTPError
+        status, hdrs = exc.code, exc.headers
+    else:
+        return None
+    if status not in (429, 503):
+        return None
+    value = hdrs.get("retry-after") if hdrs is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(tz=timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _fetch_markets(headers: dict) -> list:
+    """Fetch every page needed for TOP_N_COINS; multiple pages are requested concurrently."""
+    if len(_URLS) == 1:
+        return _http_get(_URLS[0], headers)
+    with ThreadPoolExecutor(max_workers=len(_URLS)) as pool:
+        results = list(pool.map(lambda url: _http_get(url, headers), _URLS))
+    merged: list = []
+    for page_data in results:
+        if not isinstance(page_data, list):
+            return page_data          # let validate_response report the bad shape
+        merged.extend(page_data)
+    return merged[:TOP_N_COINS]
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  Validation
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _validate_coin(raw: dict, index: int) -> Optional[dict]:
-    """
-    Validate a single coin dict.
-    Returns cleaned dict or None if invalid.
-    """
-    if _PYDANTIC:
-        try:
-            return CoinRaw(**raw).dict()
-        except (ValidationError, TypeError) as exc:
-            logger.warning("Coin[%d] validation failed: %s", index, exc)
-            return None
-    else:
-        # Manual validation
-        missing = REQUIRED_KEYS - set(raw.keys())
-        if missing:
-            logger.warning("Coin[%d] missing fields: %s", index, missing)
-            return None
-        # Remap to canonical names
-        try:
-            return {
-                "id":                          str(raw["id"]),
-                "symbol":                      str(raw["symbol"]),
-                "name":                        str(raw["name"]),
-                "current_price":               float(raw["current_price"] or 0),
-                "market_cap":                  float(raw["market_cap"] or 0),
-                "total_volume":                float(raw["total_volume"] or 0),
-                "price_change_percentage_24h": float(raw.get("price_change_percentage_24h") or 0),
-                "market_cap_rank":             int(raw.get("market_cap_rank") or 9999),
-            }
-        except (ValueError, TypeError) as exc:
-            logger.warning("Coin[%d] coercion error: %s", index, exc)
-            return None
+def _validate_coin_pydantic(raw: dict, index: int) -> Optional[dict]:
+    try:
+        return _fill_nulls(_COIN_ADAPTER.validate_python(raw))
+    except (ValidationError, TypeError) as exc:
+        logger.warning("Coin[%d] validation failed: %s", index, exc)
+        return None
+
+
+_NUMERIC = (int, float, type(None))
+
+
+def _coerce_coin(raw: dict, index: int) -> Optional[dict]:
+    """Slow path for payloads carrying numbers as strings or other odd types."""
+    try:
+        return {
+            "id":                          str(raw["id"]),
+            "symbol":                      str(raw["symbol"]),
+            "name":                        str(raw["name"]),
+            "current_price":               float(raw["current_price"] or 0),
+            "market_cap":                  float(raw["market_cap"] or 0),
+            "total_volume":                float(raw["total_volume"] or 0),
+            "price_change_percentage_24h": float(raw.get("price_change_percentage_24h") or 0),
+            "market_cap_rank":             int(raw.get("market_cap_rank") or 9999),
+        }
+    except (ValueError, TypeError) as exc:
+        logger.warning("Coin[%d] coercion error: %s", index, exc)
+        return None
+
+
+def _validate_coin_manual(raw: dict, index: int) -> Optional[dict]:
+    if not raw.keys() >= REQUIRED_KEYS:
+        logger.warning("Coin[%d] missing fields: %s", index, REQUIRED_KEYS - raw.keys())
+        return None
+    # Each key is read exactly once; well-typed numbers skip the try/except path
+    cp   = raw["current_price"]
+    mc   = raw["market_cap"]
+    tv   = raw["total_volume"]
+    pc   = raw["price_change_percentage_24h"]
+    rank = raw["market_cap_rank"]
+    if not (isinstance(cp, _NUMERIC) and isinstance(mc, _NUMERIC)
+            and isinstance(tv, _NUMERIC) and isinstance(pc, _NUMERIC)
+            and isinstance(rank, _NUMERIC)):
+        return _coerce_coin(raw, index)
+    return {
+        "id":                          str(raw["id"]),
+        "symbol":                      str(raw["symbol"]),
+        "name":                        str(raw["name"]),
+        "current_price":               float(cp or 0),
+        "market_cap":                  float(mc or 0),
+        "total_volume":                float(tv or 0),
+        "price_change_percentage_24h": float(pc or 0),
+        "market_cap_rank":             int(rank or 9999),
+    }
+
+
+# Validate a single coin dict → cleaned dict or None if invalid.
+# The backend is chosen once here rather than on every call.
+_validate_coin = _validate_coin_pydantic if _PYDANTIC else _validate_coin_manual
 
 
 def validate_response(data: Any) -> list[dict]:
@@ -171,6 +326,14 @@ def validate_response(data: Any) -> list[dict]:
     if len(data) == 0:
         raise ValueError("API returned empty list — possible rate limit or outage")
 
+    if _PYDANTIC:
+        # Fast path: the whole list in one pydantic-core call. Any bad record
+        # drops to the per-item loop below, which skips and logs it.
+        try:
+            return [_fill_nulls(c) for c in _COIN_LIST_ADAPTER.validate_python(data)]
+        except ValidationError:
+            pass
+
     valid = []
     for i, item in enumerate(data):
         if not isinstance(item, dict):
@@ -194,24 +357,88 @@ def validate_response(data: Any) -> list[dict]:
 #  Raw JSON persistence
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _dump_json(payload: dict) -> bytes:
+    if _ORJSON:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, default=str).encode()
+
+
+def _data_hash(data: list[dict]) -> str:
+    return hashlib.blake2b(_dump_json(data), digest_size=16).hexdigest()
+
+
+# (hash, filename) of the newest full snapshot; seeded from disk on first save
+_last_snapshot: Optional[tuple[str, str]] = None
+_last_snapshot_seeded = False
+
+
+def _seed_last_snapshot() -> None:
+    global _last_snapshot, _last_snapshot_seeded
+    _last_snapshot_seeded = True
+    latest = list_raw_snapshots(1)
+    if not latest:
+        return
+    try:
+        _last_snapshot = (_data_hash(load_raw_snapshot(latest[0])), latest[0].name)
+    except Exception as exc:
+        logger.debug("Could not seed snapshot hash from %s: %s", latest[0].name, exc)
+
+
 def _save_raw(data: list[dict], timestamp: datetime) -> Path:
     """
-    Save raw API response to raw_data/<ISO_TIMESTAMP>.json
+    Save raw API response to raw_data/<ISO_TIMESTAMP>.json.gz
+    If the data is identical to the previous snapshot, only a
+    raw_data/<ISO_TIMESTAMP>.ref pointer to that file is written.
     Returns the path for logging / audit.
     """
+    global _last_snapshot
+    if not _last_snapshot_seeded:
+        _seed_last_snapshot()
+
     ts_str = timestamp.strftime("%Y%m%dT%H%M%SZ")
-    path   = RAW_DIR / f"coingecko_{ts_str}.json"
+    digest = _data_hash(data)
+    if _last_snapshot is not None and _last_snapshot[0] == digest:
+        path = RAW_DIR / f"coingecko_{ts_str}.ref"
+        path.write_bytes(_dump_json({"ref": _last_snapshot[1], "hash": digest}))
+        logger.debug("Raw data unchanged — pointer saved: %s", path)
+        return path
+
+    path   = RAW_DIR / f"coingecko_{ts_str}.json.gz"
     payload = {
         "extracted_at": timestamp.isoformat(),
         "coin_count":   len(data),
         "source":       "coingecko_markets",
         "data":         data,
     }
-    path.write_text(json.dumps(payload, indent=2, default=str))
+    # Level 1: most of the size win for a fraction of the CPU of the default 9
+    with gzip.open(path, "wb", compresslevel=1) as fh:
+        fh.write(_dump_json(payload))
+    _last_snapshot = (digest, path.name)
+    _index_append(path)
     logger.debug("Raw snapshot saved: %s", path)
     return path
 
 
+# One worker keeps writes ordered (and _last_snapshot single-threaded);
+# atexit waits for any in-flight write so no snapshot is lost on shutdown.
+_snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snap")
+atexit.register(_snapshot_executor.shutdown, wait=True)
+
+
+def _log_snapshot_done(fut: Future) -> None:
+    exc = fut.exception()
+    if exc is not None:
+        logger.error("Raw snapshot write failed: %s", exc)
+    else:
+        logger.info("Raw snapshot → %s", fut.result().name)
+
+
+def _save_raw_async(data: list[dict], timestamp: datetime) -> Future:
+    fut = _snapshot_executor.submit(_save_raw, data, timestamp)
+    fut.add_done_callback(_log_snapshot_done)
+    return fut
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  Main extract function
 # ══════════════════════════════════════════════════════════════════════════════
@@ -226,10 +453,10 @@ def extract() -> tuple[list[dict], datetime]:
     Raises:
         RuntimeError: if all retries exhausted
     """
-    url     = _build_url()
-    headers = _build_headers()
+    headers = _HEADERS
     extracted_at = datetime.now(tz=timezone.utc)
     last_exc: Exception | None = None
+    prev_sleep = RETRY_BACKOFF
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
@@ -237,15 +464,14 @@ def extract() -> tuple[list[dict], datetime]:
                 "Extract attempt %d/%d — fetching top %d coins",
                 attempt, MAX_RETRIES, TOP_N_COINS
             )
-            raw_data = _http_get(url, headers)
+            raw_data = _fetch_markets(headers)
 
             # Validate
             validated = validate_response(raw_data)
             logger.info("Extracted %d valid coins", len(validated))
 
-            # Persist raw snapshot
-            snapshot_path = _save_raw(raw_data, extracted_at)
-            logger.info("Raw snapshot → %s", snapshot_path.name)
+            # Persist raw snapshot in the background
+            _save_raw_async(raw_data, extracted_at)
 
             return validated, extracted_at
 
@@ -256,7 +482,11 @@ def extract() -> tuple[list[dict], datetime]:
 
         except Exception as exc:
             last_exc = exc
-            wait = RETRY_BACKOFF ** attempt
+            # Decorrelated jitter keeps parallel instances from retrying in lockstep
+            prev_sleep = min(RETRY_SLEEP_CAP, random.uniform(RETRY_BACKOFF, prev_sleep * 3))
+            server_wait = _retry_after(exc)
+            # Retry-After is honoured but capped, so a bad header can't stall the scheduler
+            wait = min(RETRY_SLEEP_CAP, server_wait) if server_wait is not None else prev_sleep
             logger.warning(
                 "Extract attempt %d failed: %s — retrying in %.1fs",
                 attempt, exc, wait
@@ -273,15 +503,83 @@ def extract() -> tuple[list[dict], datetime]:
 #  Utility: list saved snapshots
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Append-only "<epoch>\t<filename>" log of full snapshots, oldest first, so
+# listing reads the file tail instead of scanning the directory.
+_INDEX_NAME = "_index.txt"
+
+
+def _name_timestamp(name: str) -> float:
+    """Epoch seconds from a coingecko_<YYYYmmddTHHMMSSZ>.* name (the only timestamp indexed)."""
+    try:
+        stamp = name.split("_", 1)[1].split(".", 1)[0]
+        return datetime.strptime(stamp, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except (IndexError, ValueError):
+        return 0.0
+
+
+def _scan_snapshots() -> list[Path]:
+    """Snapshot files on disk, oldest first (names sort chronologically)."""
+    return sorted(RAW_DIR.glob("coingecko_*.json*"))
+
+
+def _rebuild_index() -> Path:
+    """One-off directory scan for raw_data/ folders created before the index existed."""
+    index = RAW_DIR / _INDEX_NAME
+    index.write_text("".join(f"{_name_timestamp(p.name)}\t{p.name}\n" for p in _scan_snapshots()))
+    return index
+
+
+def _index_append(path: Path) -> None:
+    index = RAW_DIR / _INDEX_NAME
+    if not index.exists():
+        _rebuild_index()        # already includes `path`
+        return
+    with open(index, "a") as fh:
+        fh.write(f"{_name_timestamp(path.name)}\t{path.name}\n")
+
+
+def _tail_lines(path: Path, n: int, chunk: int = 8192) -> list[str]:
+    """Last `n` lines of a file, read backwards in chunks."""
+    with open(path, "rb") as fh:
+        fh.seek(0, 2)
+        pos, data = fh.tell(), b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(chunk, pos)
+            pos -= step
+            fh.seek(pos)
+            data = fh.read(step) + data
+    return data.decode().splitlines()[-n:]
+
+
 def list_raw_snapshots(limit: int = 10) -> list[Path]:
-    """Return the N most recent raw snapshots."""
-    snaps = sorted(RAW_DIR.glob("coingecko_*.json"), reverse=True)
-    return snaps[:limit]
+    """
+    Return the N most recent raw snapshots (gzip and legacy plain JSON).
+    Read-only: without an index it scans the directory; index entries whose
+    file has since been deleted or pruned are skipped.
+    """
+    if limit <= 0:
+        return []
+    index = RAW_DIR / _INDEX_NAME
+    if not index.exists():
+        return _scan_snapshots()[::-1][:limit]
+    n = limit
+    while True:
+        lines = _tail_lines(index, n)
+        names = [line.partition("\t")[2] for line in reversed(lines)]
+        paths = [RAW_DIR / name for name in names if name and (RAW_DIR / name).exists()]
+        if len(paths) >= limit or len(lines) < n:
+            return paths[:limit]
+        n *= 4                  # some entries were stale — look further back
 
 
 def load_raw_snapshot(path: Path) -> list[dict]:
     """Reload a raw snapshot for replay / backfill."""
-    payload = json.loads(path.read_text())
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as fh:
+            raw = fh.read()
+    else:
+        raw = path.read_bytes()
+    payload = _loads(raw)
     logger.info(
         "Loaded snapshot %s (%d coins, extracted %s)",
         path.name, payload["coin_count"], payload["extracted_at"]
@@ -315,6 +613,7 @@ if __name__ == "__main__":
             f"${c['current_price']:>14,.4f}"
         )
 
+    _snapshot_executor.shutdown(wait=True)     # let the background write land
     snaps = list_raw_snapshots()
     print(f"\nRaw snapshots saved: {len(snaps)}")
     if snaps:
@@ -2,36 +2,36 @@
 load.py — ETL Load Layer
 ==========================
 Responsibilities:
-  • Accept a list of TransformedCoin records
+  • Accept any iterable of TransformedCoin records (list or generator)
   • Insert into crypto_market with UPSERT (ON CONFLICT DO UPDATE)
-  • Use batch inserts for efficiency (executemany / execute_values)
+  • Use batch inserts for efficiency (executemany / unnest arrays / COPY)
   • Wrap each batch in a single transaction
   • Return a LoadResult summary for the orchestrator
   • Support both PostgreSQL and SQLite
 
 Design choices:
   • UPSERT key = (coin_id, extracted_at) — idempotent re-runs
-  • psycopg2.extras.execute_values for fast bulk Postgres inserts
+  • Postgres batches go in as one array per column through unnest(), so the
+    planner sees a single row source; large loads (≥ COPY_MIN_ROWS) COPY into
+    a temp staging table and merge with one upsert
   • SQLite uses executemany with INSERT OR REPLACE
   • Configurable BATCH_SIZE to avoid oversized transactions
+  • Row tuples and batches are built lazily — one batch in memory at a time
   • LoadResult dataclass carries inserted/updated counts back to orchestrator
 """
 
+import io
 import logging
+import operator
+from collections.abc import Iterable, Iterator, Sized
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
+from itertools import islice
 
 logger = logging.getLogger(__name__)
 
-try:
-    import psycopg2.extras
-    _PG = True
-except ImportError:
-    _PG = False
-
 from config import BATCH_SIZE
-from database import db, PostgresManager, SQLiteManager
+from database import db, PostgresManager, POSTGRES_AVAILABLE
 from transform import TransformedCoin
 
 
@@ -65,31 +65,39 @@ class LoadResult:
 #  Row builders
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _coin_to_tuple(coin: TransformedCoin) -> tuple:
-    """Convert TransformedCoin to a tuple matching INSERT column order."""
-    return (
-        coin.coin_id,
-        coin.symbol,
-        coin.name,
-        coin.current_price,
-        coin.market_cap,
-        coin.total_volume,
-        coin.price_change_24h,
-        coin.market_cap_rank,
-        coin.volatility_score,
-        coin.extracted_at,
-    )
+# TransformedCoin → tuple in INSERT column order. attrgetter builds the whole
+# tuple in C (and TransformedCoin uses __slots__), so there's no per-row frame.
+_coin_to_tuple = operator.attrgetter(
+    "coin_id",
+    "symbol",
+    "name",
+    "current_price",
+    "market_cap",
+    "total_volume",
+    "price_change_24h",
+    "market_cap_rank",
+    "volatility_score",
+    "extracted_at",
+)
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    """Yield consecutive lists of up to `size` rows without materialising them all."""
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  PostgreSQL load
 # ══════════════════════════════════════════════════════════════════════════════
 
-_PG_UPSERT = """
-    INSERT INTO crypto_market
-        (coin_id, symbol, name, current_price, market_cap, total_volume,
-         price_change_24h, market_cap_rank, volatility_score, extracted_at)
-    VALUES %s
+_PG_COLUMNS = (
+    "coin_id, symbol, name, current_price, market_cap, total_volume, "
+    "price_change_24h, market_cap_rank, volatility_score, extracted_at"
+)
+
+_PG_ON_CONFLICT = """
     ON CONFLICT (coin_id, extracted_at)
     DO UPDATE SET
         symbol            = EXCLUDED.symbol,
@@ -102,25 +110,63 @@ _PG_UPSERT = """
         volatility_score  = EXCLUDED.volatility_score
 """
 
-_PG_TEMPLATE = "(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
+def _pg_counted(upsert: str) -> str:
+    """
+    Wrap an upsert so it returns one (inserted, updated) row. xmax is 0 only
+    for freshly inserted tuples; counting in SQL avoids shipping a row back
+    per upserted coin.
+    """
+    return f"""
+    WITH up AS ({upsert}
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+    FROM up"""
+
+
+# One array parameter per column instead of a VALUES tuple per row. Prepared
+# server-side once per pooled connection, so each batch is just an EXECUTE.
+_PG_UPSERT = f"""
+    INSERT INTO crypto_market ({_PG_COLUMNS})
+    SELECT * FROM unnest($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+{_PG_ON_CONFLICT}"""
 
+_PG_PREPARE_UPSERT = (
+    "PREPARE crypto_upsert (varchar[], varchar[], varchar[], float8[], float8[], "
+    "float8[], float8[], int[], float8[], timestamptz[]) AS" + _pg_counted(_PG_UPSERT)
+)
+_PG_EXECUTE_UPSERT = "EXECUTE crypto_upsert (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
 
-def _load_postgres(manager: "PostgresManager", batches: list[list[tuple]]) -> LoadResult:
+# id(connection) → backend PID it was prepared on; the PID check catches a
+# replaced connection that happens to reuse the same id().
+_pg_prepared: dict[int, int] = {}
+
+
+def _ensure_prepared(conn, cur) -> None:
+    pid = conn.get_backend_pid()
+    if _pg_prepared.get(id(conn)) != pid:
+        cur.execute(_PG_PREPARE_UPSERT)
+        _pg_prepared[id(conn)] = pid
+
+
+def _load_postgres(manager: "PostgresManager", batches: Iterable[list[tuple]]) -> LoadResult:
     result = LoadResult()
     import time
     t0 = time.perf_counter()
 
     with manager.get_connection() as conn:
         with conn.cursor() as cur:
+            _ensure_prepared(conn, cur)
             for batch in batches:
                 try:
-                    before = cur.rowcount
-                    psycopg2.extras.execute_values(
-                        cur, _PG_UPSERT, batch, template=_PG_TEMPLATE, page_size=len(batch)
-                    )
+                    # Rows → column lists (psycopg2 adapts lists, not tuples, to ARRAY)
+                    cur.execute(_PG_EXECUTE_UPSERT, [list(col) for col in zip(*batch)])
+                    inserted, updated = cur.fetchone()
                     result.total    += len(batch)
-                    result.inserted += cur.rowcount  # rows affected
-                    logger.debug("Batch of %d rows upserted (rowcount=%d)", len(batch), cur.rowcount)
+                    result.inserted += inserted
+                    result.updated  += updated
+                    logger.debug("Batch of %d rows upserted (inserted=%d, updated=%d)",
+                                 len(batch), inserted, updated)
                 except Exception as exc:
                     logger.error("Batch load failed: %s", exc)
                     result.failed += len(batch)
@@ -130,6 +176,74 @@ def _load_postgres(manager: "PostgresManager", batches: list[list[tuple]]) -> Lo
     return result
 
 
+# Below this many rows the single unnest() upsert is cheaper than
+# creating a staging table; above it COPY's bulk wire path wins.
+COPY_MIN_ROWS = 500
+
+# Explicit columns (not LIKE crypto_market) so the stage doesn't draw ids from
+# the BIGSERIAL sequence; dropped automatically when the load commits.
+_PG_STAGE_DDL = """
+    CREATE TEMP TABLE crypto_market_stage (
+        coin_id           VARCHAR(100),
+        symbol            VARCHAR(20),
+        name              VARCHAR(200),
+        current_price     DOUBLE PRECISION,
+        market_cap        DOUBLE PRECISION,
+        total_volume      DOUBLE PRECISION,
+        price_change_24h  DOUBLE PRECISION,
+        market_cap_rank   INTEGER,
+        volatility_score  DOUBLE PRECISION,
+        extracted_at      TIMESTAMPTZ
+    ) ON COMMIT DROP
+"""
+
+_PG_MERGE = f"""
+    INSERT INTO crypto_market ({_PG_COLUMNS})
+    SELECT {_PG_COLUMNS} FROM crypto_market_stage
+{_PG_ON_CONFLICT}"""
+_PG_MERGE_COUNTED = _pg_counted(_PG_MERGE)
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value) -> str:
+    """Render one field in COPY text format (NULL → \\N, backslash-escaped text)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def _load_postgres_copy(manager: "PostgresManager", rows: Iterable[tuple]) -> LoadResult:
+    result = LoadResult()
+    import time
+    t0 = time.perf_counter()
+
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(map(_copy_value, row)))
+        buf.write("\n")
+        result.total += 1
+    buf.seek(0)
+
+    try:
+        with manager.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_PG_STAGE_DDL)
+                cur.copy_expert(f"COPY crypto_market_stage ({_PG_COLUMNS}) FROM STDIN", buf)
+                cur.execute(_PG_MERGE_COUNTED)
+                result.inserted, result.updated = cur.fetchone()
+    except Exception as exc:
+        logger.error("COPY load failed: %s", exc)
+        result.failed, result.inserted, result.updated = result.total, 0, 0
+
+    result.duration_ms = (time.perf_counter() - t0) * 1000
+    return result
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  SQLite load
 # ══════════════════════════════════════════════════════════════════════════════
@@ -142,21 +256,23 @@ _SQLITE_UPSERT = """
 """
 
 
-def _load_sqlite(manager: "SQLiteManager", batches: list[list[tuple]]) -> LoadResult:
+def _load_sqlite(manager, batches: Iterable[list[tuple]]) -> LoadResult:
     result = LoadResult()
     import time
     t0 = time.perf_counter()
 
+    # WAL / synchronous=NORMAL / temp_store are set per connection in database.py.
+    # All batches share one transaction, committed when get_connection() exits;
+    # IMMEDIATE takes the write lock up front instead of upgrading mid-load.
     with manager.get_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
         cur = conn.cursor()
         for batch in batches:
-            # SQLite executemany handles each row's INSERT OR REPLACE
-            sqlite_batch = [
-                row[:-1] + (row[-1].isoformat() if isinstance(row[-1], datetime) else row[-1],)
-                for row in batch
-            ]
+            # SQLite executemany handles each row's INSERT OR REPLACE;
+            # datetimes are bound through the adapter registered in database.py
             try:
-                cur.executemany(_SQLITE_UPSERT, sqlite_batch)
+                cur.executemany(_SQLITE_UPSERT, batch)
                 result.total    += len(batch)
                 result.inserted += cur.rowcount
             except Exception as exc:
@@ -171,35 +287,35 @@ def _load_sqlite(manager: "SQLiteManager", batches: list[list[tuple]]) -> LoadRe
 #  Public load function
 # ══════════════════════════════════════════════════════════════════════════════
 
-def load(coins: list[TransformedCoin], batch_size: int = BATCH_SIZE) -> LoadResult:
+def load(coins: Iterable[TransformedCoin], batch_size: int = BATCH_SIZE) -> LoadResult:
     """
-    Load a list of TransformedCoin records into the database.
+    Load TransformedCoin records into the database.
 
     Args:
-        coins:      Output from transform.transform()
+        coins:      Output from transform.transform(), or any iterable of coins
         batch_size: Number of rows per INSERT batch
 
     Returns:
         LoadResult with insert/update/failure counts
     """
-    if not coins:
-        logger.warning("load() called with empty list — nothing to do")
-        return LoadResult()
-
-    # Build row tuples
-    rows = [_coin_to_tuple(c) for c in coins]
-
-    # Split into batches
-    batches = [rows[i: i + batch_size] for i in range(0, len(rows), batch_size)]
-    logger.info(
-        "Loading %d coins in %d batch(es) (batch_size=%d)",
-        len(coins), len(batches), batch_size
-    )
+    if isinstance(coins, Sized):
+        if not coins:
+            logger.warning("load() called with empty list — nothing to do")
+            return LoadResult()
+        logger.info("Loading %d coins (batch_size=%d)", len(coins), batch_size)
+    else:
+        logger.info("Loading streamed coins (batch_size=%d)", batch_size)
+
+    # Row tuples are built per batch as the loader pulls them
+    batches = _batched(map(_coin_to_tuple, coins), batch_size)
 
     manager = db()
 
-    if isinstance(manager, PostgresManager) and _PG:
-        result = _load_postgres(manager, batches)
+    if isinstance(manager, PostgresManager) and POSTGRES_AVAILABLE:
+        if isinstance(coins, Sized) and len(coins) >= COPY_MIN_ROWS:
+            result = _load_postgres_copy(manager, map(_coin_to_tuple, coins))
+        else:
+            result = _load_postgres(manager, batches)
     else:
         result = _load_sqlite(manager, batches)
 
@@ -222,6 +338,25 @@ def get_row_count() -> int:
         return row[0]
 
 
+def get_row_count_estimate() -> int:
+    """
+    Cheap row count for UI badges. On Postgres this reads the planner's
+    pg_class.reltuples estimate (a catalog lookup, not a table scan); it falls
+    back to the exact COUNT(*) when there is no estimate yet or on SQLite.
+    """
+    manager = db()
+    if isinstance(manager, PostgresManager):
+        with manager.get_cursor() as cur:
+            cur.execute(
+                "SELECT reltuples::bigint AS n FROM pg_class WHERE relname = 'crypto_market'"
+            )
+            row = cur.fetchone()
+        estimate = (row["n"] if isinstance(row, dict) else row[0]) if row else 0
+        if estimate > 0:
+            return estimate
+    return get_row_count()
+
+
 def get_latest_snapshot() -> list[dict]:
     """Return the most recently extracted set of coins."""
     manager = db()
@@ -233,7 +368,10 @@ def get_latest_snapshot() -> list[dict]:
     with manager.get_cursor() as cur:
         cur.execute(sql)
         rows = cur.fetchall()
-        return [dict(r) for r in rows]
+    # Postgres' RealDictCursor rows are already dicts; only sqlite3.Row needs a copy
+    if not rows or isinstance(rows[0], dict):
+        return rows
+    return [dict(r) for r in rows]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
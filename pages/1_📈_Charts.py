@@ -13,7 +13,7 @@ st.set_page_config(
 
 from analysis import (
     get_market_df, volume_comparison, volatility_ranking,
-    price_history, detect_anomalies
+    get_history_df, detect_anomalies
 )
 from config import ZSCORE_THRESHOLD
 
@@ -42,7 +42,8 @@ with col3:
 st.markdown("---")
 
 # Load data with caching
-@st.cache_data(ttl=55)
+# Shared across sessions without pickling; the frames are only read below
+@st.cache_resource(ttl=55, max_entries=1)
 def load_market_df():
     try:
         return get_market_df()
@@ -61,9 +62,12 @@ def load_volatility():
 def load_anomalies():
     return detect_anomalies()
 
-@st.cache_data(ttl=55)
+@st.cache_resource(ttl=55, max_entries=200)
 def load_history(coin_id: str):
-    return price_history(coin_id, 100)
+    try:
+        return get_history_df(coin_id, 100)
+    except Exception:
+        return pd.DataFrame()
 
 market_df = load_market_df()
 vol_data = load_volume()
@@ -235,14 +239,9 @@ else:
     coin_options = ["bitcoin", "ethereum", "binancecoin"]
 
 selected_coin = st.selectbox("Select Cryptocurrency", coin_options, index=0)
-hist = load_history(selected_coin)
+df_hist = load_history(selected_coin)
 
-if hist:
-    df_hist = pd.DataFrame(hist)
-    if "extracted_at" in df_hist.columns:
-        df_hist["extracted_at"] = pd.to_datetime(df_hist["extracted_at"])
-        df_hist = df_hist.sort_values("extracted_at")
-    
+if not df_hist.empty:
     fig_hist = go.Figure()
     fig_hist.add_trace(go.Scatter(
         x=df_hist["extracted_at"],
@@ -1,6 +1,7 @@
 """CRYPTEX Market Page - Full market data with filtering and export"""
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 
@@ -11,7 +12,7 @@ st.set_page_config(
 )
 
 from analysis import get_market_df, detect_anomalies
-from load import get_row_count
+from load import get_row_count_estimate
 
 # Custom CSS
 st.markdown("""
@@ -37,13 +38,34 @@ with col3:
 
 st.markdown("---")
 
+def fmt_bm(s: pd.Series, prefix: str = "$") -> pd.Series:
+    """Vectorised "$1.23B" / "$4.56M" formatting (billions from 1e9, else millions)."""
+    v = s.to_numpy(dtype=np.float64)
+    big = v >= 1e9
+    text = np.char.add(
+        np.char.mod(prefix + "%.2f", np.where(big, v / 1e9, v / 1e6)),
+        np.where(big, "B", "M"),
+    )
+    return pd.Series(text, index=s.index)
+
 # Load data with caching
-@st.cache_data(ttl=55)
+# Shared across sessions without pickling; filtering below never mutates it
+@st.cache_resource(ttl=55, max_entries=1)
 def load_market_df():
     try:
-        return get_market_df()
+        df = get_market_df()
     except Exception:
         return pd.DataFrame()
+    if not df.empty:
+        # One pre-lowered "name\0symbol" key: search is a single literal scan
+        df["_search_key"] = (
+            df["name"].astype(str).str.lower() + "\x00" + df["symbol"].astype(str).str.lower()
+        )
+    return df
+
+@st.cache_data(ttl=55)
+def load_row_count():
+    return get_row_count_estimate()
 
 @st.cache_data(ttl=55)
 def load_anomalies():
@@ -85,7 +107,7 @@ with st.sidebar:
     sort_order = st.radio("Order", ["Descending", "Ascending"])
     
     st.markdown("---")
-    st.markdown(f"**Total Records:** {get_row_count():,}")
+    st.markdown(f"**Total Records:** {load_row_count():,}")
 
 # Anomaly Alert
 if anomalies:
@@ -100,16 +122,18 @@ st.markdown("---")
 # Market Stats
 if not market_df.empty:
     col1, col2, col3, col4 = st.columns(4)
+    # Count on the raw array instead of materialising two filtered frames
+    pc = market_df['price_change_24h'].to_numpy()
+    gainers = int((pc > 0).sum())
+    losers = int((pc < 0).sum())
     
     with col1:
         st.metric("Total Coins", len(market_df))
     
     with col2:
-        gainers = len(market_df[market_df['price_change_24h'] > 0])
         st.metric("Gainers (24H)", gainers, delta=f"{gainers/len(market_df)*100:.1f}%")
     
     with col3:
-        losers = len(market_df[market_df['price_change_24h'] < 0])
         st.metric("Losers (24H)", losers, delta=f"-{losers/len(market_df)*100:.1f}%")
     
     with col4:
@@ -125,8 +149,7 @@ if not market_df.empty:
     # Apply search filter
     if search:
         filtered_df = filtered_df[
-            filtered_df['name'].str.contains(search, case=False, na=False) |
-            filtered_df['symbol'].str.contains(search, case=False, na=False)
+            filtered_df['_search_key'].str.contains(search.lower(), regex=False)
         ]
     
     # Apply price filter
@@ -178,27 +201,25 @@ if not market_df.empty:
     
     df_display = df_display.rename(columns=rename_map)
     
-    # Format numbers
+    # Format numbers (whole-column numpy formatting, no per-row lambdas)
     if "Price (USD)" in df_display.columns:
-        df_display["Price (USD)"] = df_display["Price (USD)"].apply(lambda x: f"${x:,.4f}")
+        # %-formatting has no thousands separator, so this one stays a bound format
+        df_display["Price (USD)"] = df_display["Price (USD)"].map("${:,.4f}".format)
     
     if "Market Cap" in df_display.columns:
-        df_display["Market Cap"] = df_display["Market Cap"].apply(
-            lambda x: f"${x/1e9:.2f}B" if x >= 1e9 else f"${x/1e6:.2f}M"
-        )
+        df_display["Market Cap"] = fmt_bm(df_display["Market Cap"])
     
     if "Volume 24H" in df_display.columns:
-        df_display["Volume 24H"] = df_display["Volume 24H"].apply(
-            lambda x: f"${x/1e9:.2f}B" if x >= 1e9 else f"${x/1e6:.2f}M"
-        )
+        df_display["Volume 24H"] = fmt_bm(df_display["Volume 24H"])
     
     if "Change 24H %" in df_display.columns:
-        df_display["Change 24H %"] = df_display["Change 24H %"].apply(lambda x: f"{x:+.2f}%")
+        df_display["Change 24H %"] = pd.Series(
+            np.char.mod("%+.2f%%", df_display["Change 24H %"].to_numpy(dtype=np.float64)),
+            index=df_display.index,
+        )
     
     if "Volatility" in df_display.columns:
-        df_display["Volatility"] = df_display["Volatility"].apply(
-            lambda x: f"{x/1e9:.2f}B" if x >= 1e9 else f"{x/1e6:.2f}M"
-        )
+        df_display["Volatility"] = fmt_bm(df_display["Volatility"], prefix="")
     
     # Display with color coding
     st.dataframe(
@@ -213,20 +234,19 @@ if not market_df.empty:
     
     col1, col2 = st.columns(2)
     
+    # Callables defer serialisation to the click instead of every rerun
     with col1:
-        csv = filtered_df.to_csv(index=False)
         st.download_button(
             label="Download as CSV",
-            data=csv,
+            data=lambda: filtered_df.drop(columns="_search_key").to_csv(index=False),
             file_name=f"cryptex_market_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv"
         )
     
     with col2:
-        json = filtered_df.to_json(orient='records', indent=2)
         st.download_button(
             label="Download as JSON",
-            data=json,
+            data=lambda: filtered_df.drop(columns="_search_key").to_json(orient='records', indent=2),
             file_name=f"cryptex_market_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
             mime="application/json"
         )
@@ -39,6 +39,18 @@ SAMPLE_RAW = [
 TS = datetime(2025, 1, 15, 12, 0, 0, tzinfo=timezone.utc)
 
 
+# Built once per session. Tuples so no test can grow them; the dicts inside
+# are only read (validate_response/transform return new records).
+@pytest.fixture(scope="session")
+def raw_with_junk():
+    return (*SAMPLE_RAW, {"id": "junk"})   # junk row is missing required fields
+
+
+@pytest.fixture(scope="session")
+def null_price_raw():
+    return ({**SAMPLE_RAW[0], "current_price": None},)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  extract.py tests
 # ══════════════════════════════════════════════════════════════════════════════
@@ -59,22 +71,34 @@ class TestExtractValidation:
         with pytest.raises(ValueError):
             validate_response({"error": "rate limit"})
 
-    def test_validate_drops_invalid_rows(self):
+    def test_validate_drops_invalid_rows(self, raw_with_junk):
         from extract import validate_response
-        data = SAMPLE_RAW + [{"id": "junk"}]   # missing required fields
-        result = validate_response(data)
+        result = validate_response(list(raw_with_junk))
         # junk row either dropped or coerced — must not crash
         assert len(result) <= 4
 
-    def test_validate_null_price_coerced(self):
+    def test_validate_null_price_coerced(self, null_price_raw):
         from extract import validate_response
-        data = [{**SAMPLE_RAW[0], "current_price": None}]
-        result = validate_response(data)
+        result = validate_response(list(null_price_raw))
         assert result[0]["current_price"] == 0.0
 
+    def test_retry_after_capped(self, monkeypatch):
+        import extract
+        err = OSError("rate limited")
+        err.code, err.headers = 429, {"retry-after": "86400"}
+        def rate_limited(headers):
+            raise err
+        sleeps = []
+        monkeypatch.setattr(extract, "_fetch_markets", rate_limited)
+        monkeypatch.setattr(extract.time, "sleep", sleeps.append)
+        with pytest.raises(RuntimeError, match="attempts"):
+            extract.extract()
+        assert sleeps and max(sleeps) <= extract.RETRY_SLEEP_CAP
+
     def test_list_raw_snapshots(self, tmp_path, monkeypatch):
-        import config
+        import config, extract
         monkeypatch.setattr(config, "RAW_DIR", tmp_path)
+        monkeypatch.setattr(extract, "RAW_DIR", tmp_path)   # bound at import
         # Create fake snapshots
         for ts in ["20250101T120000Z", "20250101T130000Z"]:
             (tmp_path / f"coingecko_{ts}.json").write_text("{}")
@@ -83,6 +107,24 @@ class TestExtractValidation:
         assert len(snaps) == 2
         # Most recent first
         assert "130000" in snaps[0].name
+        assert not (tmp_path / "_index.txt").exists()   # listing never writes
+
+    def test_snapshot_index_skips_deleted_files(self, tmp_path, monkeypatch):
+        import extract
+        monkeypatch.setattr(extract, "RAW_DIR", tmp_path)
+        monkeypatch.setattr(extract, "_last_snapshot_seeded", True)
+        monkeypatch.setattr(extract, "_last_snapshot", None)
+        for minute in range(3):
+            data = [{**SAMPLE_RAW[0], "current_price": 100.0 + minute}]
+            extract._save_raw(data, TS.replace(minute=minute))
+        newest = extract.list_raw_snapshots(3)
+        assert [p.name for p in newest] == [
+            "coingecko_20250115T120200Z.json.gz",
+            "coingecko_20250115T120100Z.json.gz",
+            "coingecko_20250115T120000Z.json.gz",
+        ]
+        newest[0].unlink()
+        assert [p.name for p in extract.list_raw_snapshots(2)] == [p.name for p in newest[1:]]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -101,6 +143,11 @@ class TestTransform:
         for c in coins:
             assert c.symbol == c.symbol.upper()
 
+    def test_coin_id_lowercased(self):
+        from transform import transform
+        coins = transform([{**SAMPLE_RAW[0], "id": " Bitcoin "}], TS)
+        assert coins[0].coin_id == "bitcoin"
+
     def test_volatility_score_computed(self):
         from transform import transform
         coins = transform(SAMPLE_RAW, TS)
@@ -120,10 +167,9 @@ class TestTransform:
         ranks = [c.market_cap_rank for c in coins]
         assert ranks == sorted(ranks)
 
-    def test_null_price_coin_handled(self):
+    def test_null_price_coin_handled(self, null_price_raw):
         from transform import transform
-        bad = [{**SAMPLE_RAW[0], "current_price": None}]
-        coins = transform(bad, TS)
+        coins = transform(list(null_price_raw), TS)
         assert coins[0].current_price == 0.0
 
     def test_nan_price_defaulted(self):
@@ -140,6 +186,19 @@ class TestTransform:
         # SOL has highest change (+8.50)
         assert s["top_gainer"]["coin"].upper() == "SOL"
 
+    def test_summary_numpy_path_matches_loop(self):
+        from transform import transform, _summary_stats, _summary_stats_np
+        raw = [{**SAMPLE_RAW[i % 3], "id": f"coin{i}", "market_cap_rank": i + 1} for i in range(80)]
+        coins = transform(raw, TS)
+        loop, vec = _summary_stats(coins), _summary_stats_np(coins)
+        assert loop[3:] == vec[3:]
+        assert loop[:3] == pytest.approx(vec[:3])
+
+    def test_transform_coin_matches_batch(self):
+        from transform import transform, transform_coin
+        raw = {**SAMPLE_RAW[1], "current_price": float("inf"), "market_cap": "junk"}
+        assert transform_coin(raw, TS) == transform([raw], TS)[0]
+
     def test_to_dict_serializable(self):
         from transform import transform
         coins = transform(SAMPLE_RAW, TS)
@@ -168,6 +227,33 @@ class TestDatabase:
             row = cur.fetchone()
             assert row[0] == 0
 
+    def test_sqlite_connection_reused_per_thread(self, tmp_path):
+        from database import SQLiteManager
+        mgr = SQLiteManager(path=tmp_path / "test.db")
+        with mgr.get_connection() as first:
+            pass
+        with mgr.get_connection() as second:
+            assert second is first
+        mgr.close()
+
+    def test_sqlite_connections_bounded_across_threads(self, tmp_path):
+        import threading
+        from database import SQLiteManager, SQLITE_POOL_SIZE
+        mgr = SQLiteManager(path=tmp_path / "test.db")
+        mgr.create_schema()
+
+        def query():
+            with mgr.get_cursor() as cur:
+                cur.execute("SELECT 1")
+
+        for _ in range(20):   # short-lived threads, like Streamlit reruns
+            t = threading.Thread(target=query)
+            t.start()
+            t.join()
+        assert mgr._idle.qsize() <= SQLITE_POOL_SIZE
+        mgr.close()
+        assert mgr._idle.qsize() == 0
+
     def test_sqlite_rollback_on_error(self, tmp_path):
         from database import SQLiteManager
         mgr = SQLiteManager(path=tmp_path / "test.db")
@@ -235,21 +321,33 @@ class TestLoad:
 #  analysis.py tests
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _seed_sqlite(path: Path):
+    """Fresh SQLite DB at `path` holding the SAMPLE_RAW batch at TS."""
+    from database import SQLiteManager
+    from transform import transform
+    from load import load
+    import database
+    mgr = SQLiteManager(path=path)
+    mgr.create_schema()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "_db_manager", mgr)
+        load(transform(SAMPLE_RAW, TS))
+    return mgr
+
+
+@pytest.fixture(scope="class")
+def analysis_db(tmp_path_factory):
+    """One read-only seeded DB shared by TestAnalysis; tests that write seed their own."""
+    import database
+    mgr = _seed_sqlite(tmp_path_factory.mktemp("analysis") / "analysis_test.db")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "_db_manager", mgr)
+        yield mgr
+    mgr.close()
+
+
+@pytest.mark.usefixtures("analysis_db")
 class TestAnalysis:
-    @pytest.fixture(autouse=True)
-    def seed_db(self, tmp_path, monkeypatch):
-        """Seed SQLite with sample data before each test."""
-        from database import SQLiteManager
-        mgr = SQLiteManager(path=tmp_path / "analysis_test.db")
-        mgr.create_schema()
-        import database
-        monkeypatch.setattr(database, "_db_manager", mgr)
-
-        from transform import transform
-        from load import load
-        coins = transform(SAMPLE_RAW, TS)
-        load(coins)
-
     def test_top_gainers(self):
         from analysis import top_gainers
         result = top_gainers(2)
@@ -258,6 +356,23 @@ class TestAnalysis:
         if len(result) >= 2:
             assert result[0]["price_change_24h"] >= result[1]["price_change_24h"]
 
+    def test_top_gainers_null_change_last(self, tmp_path, monkeypatch):
+        import database, analysis
+        mgr = _seed_sqlite(tmp_path / "null_change.db")
+        with mgr.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO crypto_market (coin_id, symbol, name, current_price, price_change_24h, extracted_at)"
+                " VALUES ('nochange', 'nc', 'NoChange', 1.0, NULL, ?)", (TS.isoformat(),),
+            )
+        monkeypatch.setattr(database, "_db_manager", mgr)
+        monkeypatch.setattr(analysis, "_cache_get", lambda key: None)
+        analysis.clear_snapshot_cache()
+        result = analysis.top_gainers(10)
+        # NULL sorts after negative changes, as ORDER BY ... DESC did
+        assert [r["coin_id"] for r in result] == ["solana", "bitcoin", "ethereum", "nochange"]
+        analysis.clear_snapshot_cache()
+        mgr.close()
+
     def test_top_market_cap(self):
         from analysis import top_market_cap
         result = top_market_cap(3)
@@ -295,6 +410,67 @@ class TestAnalysis:
         for key in ["total_market_cap", "avg_market_cap", "highest_gainer", "most_volatile"]:
             assert key in kpi, f"Missing key: {key}"
 
+    def test_snapshot_cache_cleared_after_new_load(self, tmp_path, monkeypatch):
+        import database
+        from analysis import volatility_ranking, clear_snapshot_cache
+        from transform import transform
+        from load import load
+        mgr = _seed_sqlite(tmp_path / "cache_test.db")
+        monkeypatch.setattr(database, "_db_manager", mgr)
+        clear_snapshot_cache()
+        assert len(volatility_ranking(10)) == 3
+        later = datetime(2025, 1, 15, 12, 5, 0, tzinfo=timezone.utc)
+        load(transform(SAMPLE_RAW[:1], later))
+        clear_snapshot_cache()
+        result = volatility_ranking(10)
+        assert [r["coin_id"] for r in result] == ["bitcoin"]
+        clear_snapshot_cache()
+        mgr.close()
+
+    def test_snapshot_follows_latest_load(self, tmp_path, monkeypatch):
+        import database, analysis
+        from transform import transform
+        from load import load
+        mgr = _seed_sqlite(tmp_path / "fresh.db")
+        monkeypatch.setattr(database, "_db_manager", mgr)
+        analysis.clear_snapshot_cache()
+        assert len(analysis.get_market_df()) == 3
+
+        later = datetime(2025, 1, 15, 12, 5, 0, tzinfo=timezone.utc)
+        load(transform(SAMPLE_RAW[:1], later))
+        analysis._latest_ts_at.cache_clear()   # as when the few-second MAX() window lapses
+        df = analysis.get_market_df()
+        assert list(df["coin_id"]) == ["bitcoin"]
+        analysis.clear_snapshot_cache()
+        mgr.close()
+
+    def test_get_market_df_typed(self):
+        from analysis import get_market_df
+        df = get_market_df()
+        assert len(df) == 3
+        # Same frame backs the CSV/JSON exports: figures must stay full precision
+        for col in ("market_cap", "total_volume", "price_change_24h"):
+            assert df[col].dtype == "float64"
+        assert df["symbol"].dtype == "category"
+
+    def test_dashboard_bundle(self):
+        from analysis import dashboard_bundle
+        bundle = dashboard_bundle(2)
+        assert len(bundle.market_df) == 3
+        assert len(bundle.gainers) == 2
+        assert bundle.kpis["total_market_cap"] > 0
+        assert bundle.row_count == 3
+
+    def test_search_mask_multi_word_is_a_phrase(self):
+        import pandas as pd
+        from analysis import search_mask
+        df = pd.DataFrame({
+            "name":   ["Bitcoin", "USD Coin", "Tether", "Binance Coin"],
+            "symbol": ["BTC", "USDC", "USDT", "BNB"],
+        })
+        assert list(df[search_mask(df, "usd coin")]["name"]) == ["USD Coin"]
+        assert list(df[search_mask(df, "USD")]["symbol"]) == ["USDC", "USDT"]
+
     def test_price_history(self):
         from analysis import price_history
         rows = price_history("bitcoin")
@@ -323,11 +499,12 @@ class TestPipeline:
         mock_ts = TS
         monkeypatch.setattr("etl_pipeline.extract", lambda: (SAMPLE_RAW, mock_ts))
 
-        from etl_pipeline import run_once
+        from etl_pipeline import run_once, get_last_good
         result = run_once()
         assert result.success
         assert result.coins_extracted == 3
         assert result.coins_transformed == 3
+        assert get_last_good() is result
 
     def test_run_once_extract_failure(self, monkeypatch):
         def bad_extract():
@@ -339,6 +516,17 @@ class TestPipeline:
         assert not result.success
         assert "API down" in result.error
 
+    def test_circuit_breaker_half_open(self):
+        from etl_pipeline import CircuitBreaker
+        b = CircuitBreaker(failure_limit=2, base_cooldown=0.0)
+        b.record_failure()
+        assert b.state == "closed"
+        b.record_failure()
+        assert b.state == "open"
+        assert b.allow() and b.state == "half_open"
+        b.record_success()
+        assert b.state == "closed" and b.failures == 0
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
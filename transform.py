@@ -11,17 +11,22 @@ Responsibilities:
 
 Design choices:
   • Dataclass for TransformedCoin gives type safety + easy serialization
+    (slots=True: smaller records and faster attribute reads in load.py)
   • All transforms are pure functions (no I/O) — easy to unit-test
   • Field-level error logging with coin identity for debugging
   • Separate clean_* helpers for each domain (strings, prices, scores)
+  • Numeric fields are cleaned column-wise with NumPy; transform_coin()
+    is a one-row batch, so both entry points share the same rules
 """
 
 import logging
 import math
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Optional
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,7 +34,7 @@ logger = logging.getLogger(__name__)
 #  Output dataclass
 # ══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class TransformedCoin:
     """
     A fully-cleaned, computation-enriched coin record ready to be loaded.
@@ -45,11 +50,23 @@ class TransformedCoin:
     market_cap_rank:  int
     volatility_score: float          # abs(price_change_24h) * total_volume
     extracted_at:     datetime
+    # Batch-wide ISO string set by transform(); empty → format on demand
+    extracted_at_iso: str = field(default="", repr=False, compare=False)
 
     def to_dict(self) -> dict:
-        d = asdict(self)
-        d["extracted_at"] = self.extracted_at.isoformat()
-        return d
+        # Flat record of scalars — a literal beats asdict()'s recursive field walk
+        return {
+            "coin_id":          self.coin_id,
+            "symbol":           self.symbol,
+            "name":             self.name,
+            "current_price":    self.current_price,
+            "market_cap":       self.market_cap,
+            "total_volume":     self.total_volume,
+            "price_change_24h": self.price_change_24h,
+            "market_cap_rank":  self.market_cap_rank,
+            "volatility_score": self.volatility_score,
+            "extracted_at":     self.extracted_at_iso or self.extracted_at.isoformat(),
+        }
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -64,8 +81,12 @@ _MAX_RANK        = 100_000
 
 
 def _clean_str(value, field_name: str, coin_id: str, default: str = "") -> str:
+    # Fast path: API strings are almost always already trimmed
+    if type(value) is str and value and not value[0].isspace() and not value[-1].isspace():
+        return value
     if not isinstance(value, str) or not value.strip():
-        logger.warning("[%s] field '%s' is blank/missing — using '%s'", coin_id, field_name, default)
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("[%s] field '%s' is blank/missing — using '%s'", coin_id, field_name, default)
         return default
     return value.strip()
 
@@ -75,44 +96,55 @@ def _clean_symbol(value, coin_id: str) -> str:
     return raw.upper()
 
 
-def _clean_float(value, field_name: str, coin_id: str,
-                 min_val: float = 0.0, max_val: float = float("inf"),
-                 default: float = 0.0) -> float:
-    """
-    Coerce value to float, clamp to [min_val, max_val].
-    Returns default on failure.
-    """
-    try:
-        v = float(value)
-        if math.isnan(v) or math.isinf(v):
-            raise ValueError("nan/inf")
-        v = max(min_val, min(v, max_val))
-        return round(v, 8)
-    except (TypeError, ValueError) as exc:
-        logger.warning("[%s] field '%s' invalid (%s) — defaulting to %.2f", coin_id, field_name, exc, default)
-        return default
-
-
 def _clean_int(value, field_name: str, coin_id: str,
                min_val: int = 1, max_val: int = _MAX_RANK,
                default: int = _MAX_RANK) -> int:
+    if type(value) is int:                       # the usual case: no float round-trip
+        return max(min_val, min(value, max_val))
     try:
         return max(min_val, min(int(float(value)), max_val))
-    except (TypeError, ValueError):
-        logger.warning("[%s] field '%s' invalid — defaulting to %d", coin_id, field_name, default)
+    except (TypeError, ValueError, OverflowError):
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("[%s] field '%s' invalid — defaulting to %d", coin_id, field_name, default)
         return default
 
 
-def _compute_volatility(price_change_24h: float, total_volume: float) -> float:
+# (raw key, field name used in logs, min, max) — defaults are 0.0 for all four
+_NUMERIC_COLUMNS = (
+    ("current_price",               "current_price",    0.0,    _MAX_PRICE),
+    ("market_cap",                  "market_cap",       0.0,    _MAX_MARKET_CAP),
+    ("total_volume",                "total_volume",     0.0,    _MAX_VOLUME),
+    ("price_change_percentage_24h", "price_change_24h", -100.0, 10_000.0),
+)
+
+
+def _to_float_or_nan(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _clean_float_column(rows: list[dict], coin_ids: list[str], key: str,
+                        field_name: str, min_val: float, max_val: float) -> np.ndarray:
     """
-    volatility_score = |price_change_24h_pct| × total_volume_usd
-    
-    Interpretation:
-      High price swing + high volume = extreme volatility.
-      Used for ranking coins by market impact of their movement.
+    Coerce one numeric field to float64 across the whole batch and clamp it
+    to [min_val, max_val]. None / NaN / inf / junk become 0.0 (logged per coin).
     """
-    score = abs(price_change_24h) * total_volume
-    return round(score, 4)
+    values = [r.get(key) for r in rows]
+    try:
+        arr = np.array(values, dtype=np.float64)   # None → NaN
+    except (TypeError, ValueError):
+        arr = np.fromiter(map(_to_float_or_nan, values), dtype=np.float64, count=len(values))
+
+    bad = ~np.isfinite(arr)
+    if bad.any():
+        if logger.isEnabledFor(logging.WARNING):
+            for i in np.flatnonzero(bad):
+                logger.warning("[%s] field '%s' invalid (%r) — defaulting to 0.00",
+                               coin_ids[i], field_name, values[i])
+        arr[bad] = 0.0
+    return np.clip(arr, min_val, max_val, out=arr)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -130,62 +162,64 @@ def transform_coin(raw: dict, extracted_at: datetime) -> Optional[TransformedCoi
     Returns:
         TransformedCoin or None if the record is fundamentally broken.
     """
-    coin_id = raw.get("id", "unknown")
-
-    # ── Strings ───────────────────────────────────────────────────────────────
-    symbol = _clean_symbol(raw.get("symbol"), coin_id)
-    name   = _clean_str(raw.get("name"), "name", coin_id, coin_id)
-
-    # ── Numeric ───────────────────────────────────────────────────────────────
-    price = _clean_float(
-        raw.get("current_price"), "current_price", coin_id,
-        min_val=0.0, max_val=_MAX_PRICE
-    )
-    if price <= 0:
-        logger.warning("[%s] current_price=0 — record may be junk", coin_id)
-
-    market_cap = _clean_float(
-        raw.get("market_cap"), "market_cap", coin_id,
-        min_val=0.0, max_val=_MAX_MARKET_CAP
-    )
-    total_volume = _clean_float(
-        raw.get("total_volume"), "total_volume", coin_id,
-        min_val=0.0, max_val=_MAX_VOLUME
-    )
-    # CoinGecko returns pct as a plain float e.g. -3.14 (meaning −3.14 %)
-    price_change = _clean_float(
-        raw.get("price_change_percentage_24h"), "price_change_24h", coin_id,
-        min_val=-100.0, max_val=10_000.0, default=0.0
-    )
-    rank = _clean_int(
-        raw.get("market_cap_rank"), "market_cap_rank", coin_id
-    )
-
-    # ── Derived ───────────────────────────────────────────────────────────────
-    volatility = _compute_volatility(price_change, total_volume)
-
-    # ── Timestamp ─────────────────────────────────────────────────────────────
     if extracted_at.tzinfo is None:
         extracted_at = extracted_at.replace(tzinfo=timezone.utc)
-
-    return TransformedCoin(
-        coin_id=coin_id,
-        symbol=symbol,
-        name=name,
-        current_price=price,
-        market_cap=market_cap,
-        total_volume=total_volume,
-        price_change_24h=price_change,
-        market_cap_rank=rank,
-        volatility_score=volatility,
-        extracted_at=extracted_at,
-    )
+    coins, _ = _transform_rows([raw], extracted_at, extracted_at.isoformat())
+    return coins[0] if coins else None
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  Batch transform
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _transform_rows(raw_coins: list[dict], extracted_at: datetime,
+                    ts_iso: str) -> tuple[list[TransformedCoin], np.ndarray]:
+    """
+    Clean a batch (input order) and return it with its market_cap_rank array.
+    `extracted_at` must already be tz-aware; `ts_iso` is its isoformat().
+    """
+    # ── Strings + rank, row by row ────────────────────────────────────────────
+    rows:   list[dict] = []
+    idents: list[tuple[str, str, str, int]] = []
+    # Hot loop: globals and bound methods hoisted into locals once per batch
+    clean_symbol, clean_str, clean_int = _clean_symbol, _clean_str, _clean_int
+    add_ident, add_row = idents.append, rows.append
+    for raw in raw_coins:
+        try:
+            get = raw.get
+            coin_id = str(get("id") or "unknown").strip().lower()
+            add_ident((
+                coin_id,
+                clean_symbol(get("symbol"), coin_id),
+                clean_str(get("name"), "name", coin_id, coin_id),
+                clean_int(get("market_cap_rank"), "market_cap_rank", coin_id),
+            ))
+            add_row(raw)
+        except Exception as exc:
+            logger.error("Unexpected transform error for %s: %s", raw.get("id", "?"), exc)
+
+    # ── Numeric, column by column ─────────────────────────────────────────────
+    coin_ids = [ident[0] for ident in idents]
+    price, market_cap, total_volume, price_change = (
+        _clean_float_column(rows, coin_ids, *spec) for spec in _NUMERIC_COLUMNS
+    )
+    if logger.isEnabledFor(logging.WARNING):
+        for i in np.flatnonzero(price <= 0):
+            logger.warning("[%s] current_price=0 — record may be junk", coin_ids[i])
+    volatility = np.abs(price_change) * total_volume
+
+    coins: list[TransformedCoin] = [
+        TransformedCoin(coin_id, symbol, name, p, mc, vol, chg, rank, score, extracted_at, ts_iso)
+        for (coin_id, symbol, name, rank), p, mc, vol, chg, score in zip(
+            idents, price.tolist(), market_cap.tolist(), total_volume.tolist(),
+            price_change.tolist(), volatility.tolist(),
+        )
+    ]
+
+    ranks = np.fromiter((ident[3] for ident in idents), dtype=np.int64, count=len(idents))
+    return coins, ranks
+
+
 def transform(raw_coins: list[dict], extracted_at: datetime) -> list[TransformedCoin]:
     """
     Transform a batch of raw coin dicts.
@@ -197,56 +231,91 @@ def transform(raw_coins: list[dict], extracted_at: datetime) -> list[Transformed
     Returns:
         List of TransformedCoin records (failures silently dropped with warning)
     """
-    logger.info("Transforming %d raw coins (timestamp: %s)", len(raw_coins), extracted_at.isoformat())
+    # Normalised and formatted once per batch — every coin shares the timestamp
+    if extracted_at.tzinfo is None:
+        extracted_at = extracted_at.replace(tzinfo=timezone.utc)
+    ts_iso = extracted_at.isoformat()
 
-    results: list[TransformedCoin] = []
-    for raw in raw_coins:
-        try:
-            coin = transform_coin(raw, extracted_at)
-            if coin is not None:
-                results.append(coin)
-        except Exception as exc:
-            logger.error("Unexpected transform error for %s: %s", raw.get("id", "?"), exc)
+    log_info = logger.isEnabledFor(logging.INFO)
+    if log_info:
+        logger.info("Transforming %d raw coins (timestamp: %s)", len(raw_coins), ts_iso)
 
-    logger.info(
-        "Transform complete: %d/%d records ready (dropped %d)",
-        len(results), len(raw_coins), len(raw_coins) - len(results)
-    )
+    results, ranks = _transform_rows(raw_coins, extracted_at, ts_iso)
+
+    if log_info:
+        logger.info(
+            "Transform complete: %d/%d records ready (dropped %d)",
+            len(results), len(raw_coins), len(raw_coins) - len(results)
+        )
 
-    # Sort by market cap rank so load order is deterministic
-    results.sort(key=lambda c: c.market_cap_rank)
-    return results
+    # Sort by market cap rank so load order is deterministic (stable, like list.sort)
+    return [results[i] for i in np.argsort(ranks, kind="stable").tolist()]
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  Summary statistics (for logging / dashboard)
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Below this many coins the fused Python loop beats NumPy's per-call overhead
+_SUMMARY_NUMPY_MIN = 64
+
+
+def _summary_stats(coins: list[TransformedCoin]) -> tuple:
+    """One pass: sums, sign counts and both arg-maxes (first wins on ties, like max())."""
+    total_mc = sum_price = sum_chg = 0.0
+    n_gain = n_lose = 0
+    top_gain = top_vol = coins[0]
+    for c in coins:
+        chg = c.price_change_24h
+        total_mc  += c.market_cap
+        sum_price += c.current_price
+        sum_chg   += chg
+        if chg > 0:
+            n_gain += 1
+        elif chg < 0:
+            n_lose += 1
+        if chg > top_gain.price_change_24h:
+            top_gain = c
+        if c.volatility_score > top_vol.volatility_score:
+            top_vol = c
+    return total_mc, sum_price, sum_chg, n_gain, n_lose, top_gain, top_vol
+
+
+def _summary_stats_np(coins: list[TransformedCoin]) -> tuple:
+    """Same as _summary_stats via NumPy reductions (argmax also returns the first max)."""
+    n = len(coins)
+    mcaps   = np.fromiter((c.market_cap       for c in coins), dtype=np.float64, count=n)
+    prices  = np.fromiter((c.current_price    for c in coins), dtype=np.float64, count=n)
+    changes = np.fromiter((c.price_change_24h for c in coins), dtype=np.float64, count=n)
+    vols    = np.fromiter((c.volatility_score for c in coins), dtype=np.float64, count=n)
+    return (
+        float(mcaps.sum()), float(prices.sum()), float(changes.sum()),
+        int(np.count_nonzero(changes > 0)), int(np.count_nonzero(changes < 0)),
+        coins[int(changes.argmax())], coins[int(vols.argmax())],
+    )
+
+
 def summarize(coins: list[TransformedCoin]) -> dict:
     """Return a quick summary dict for logging and KPI display."""
     if not coins:
         return {}
 
-    prices      = [c.current_price   for c in coins]
-    mcaps       = [c.market_cap       for c in coins]
-    changes     = [c.price_change_24h for c in coins]
-    volatilities= [c.volatility_score for c in coins]
-
-    gainers  = [c for c in coins if c.price_change_24h > 0]
-    losers   = [c for c in coins if c.price_change_24h < 0]
-    top_vol  = max(coins, key=lambda c: c.volatility_score)
-    top_gain = max(coins, key=lambda c: c.price_change_24h)
+    n = len(coins)
+    if n >= _SUMMARY_NUMPY_MIN:
+        total_mc, sum_price, sum_chg, n_gain, n_lose, top_gain, top_vol = _summary_stats_np(coins)
+    else:
+        total_mc, sum_price, sum_chg, n_gain, n_lose, top_gain, top_vol = _summary_stats(coins)
 
     return {
-        "total_coins":       len(coins),
-        "total_market_cap":  sum(mcaps),
-        "avg_price":         sum(prices) / len(prices),
-        "avg_change_24h":    sum(changes) / len(changes),
-        "gainers":           len(gainers),
-        "losers":            len(losers),
+        "total_coins":       n,
+        "total_market_cap":  total_mc,
+        "avg_price":         sum_price / n,
+        "avg_change_24h":    sum_chg / n,
+        "gainers":           n_gain,
+        "losers":            n_lose,
         "top_gainer":        {"coin": top_gain.symbol, "change": top_gain.price_change_24h},
         "most_volatile":     {"coin": top_vol.symbol,  "score": top_vol.volatility_score},
-        "extracted_at":      coins[0].extracted_at.isoformat(),
+        "extracted_at":      coins[0].extracted_at_iso or coins[0].extracted_at.isoformat(),
     }
 
 